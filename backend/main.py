@@ -3,6 +3,7 @@ FastAPI server for Ruga file analysis and management.
 
 Endpoints:
 - GET /files: List all files and folders recursively, with .ruga status
+- GET /files/stream: Same listing streamed as NDJSON (for large trees)
 - POST /analyze/folder: Start analyzing a folder (returns job ID)
 - POST /analyze/file: Start analyzing a single file (returns job ID)
 - GET /jobs: List all analysis jobs with their status
@@ -11,13 +12,20 @@ Endpoints:
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import sys
+import os
+import stat
 import asyncio
-import json
+import threading
+import orjson
 from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+
+# Provider keys and settings (GREENPT_*, OPENAI_API_KEY) come from .env
+load_dotenv(override=True)
 
 # Add project root to path to import from examples
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -30,12 +38,13 @@ BACKEND_DIR = Path(__file__).parent
 if str(BACKEND_DIR) not in sys.path:
     sys.path.insert(0, str(BACKEND_DIR))
 
-from services.file_service import FileService
+from services.file_service import FileService, relpath_fast
 from services.analysis_service import AnalysisService
 from services.job_service import JobService
 from services.folder_organization_service import FolderOrganizationService
 from services.vector_store_service import VectorStoreService
 from services.chat_service import ChatService
+from utils.llm_config import close_http_clients
 from models.schemas import (
     FileInfo,
     FileListResponse,
@@ -76,7 +85,13 @@ async def lifespan(app: FastAPI):
     job_service = JobService()
     file_service = FileService()
     vector_store_service = VectorStoreService()
-    analysis_service = AnalysisService(job_service=job_service, vector_store_service=vector_store_service)
+    analysis_service = AnalysisService(
+        job_service=job_service,
+        vector_store_service=vector_store_service,
+        file_service=file_service,
+    )
+    # Workers stay running for the app's lifetime and wait on the queue
+    analysis_service.start_workers()
     folder_org_service = FolderOrganizationService(vector_store_service=vector_store_service)
     chat_service = ChatService(vector_store_service=vector_store_service)
     
@@ -87,6 +102,7 @@ async def lifespan(app: FastAPI):
     # Cleanup (if needed)
     if analysis_service:
         await analysis_service.cleanup()
+    await close_http_clients()
 
 
 app = FastAPI(
@@ -94,6 +110,7 @@ app = FastAPI(
     description="API for managing file analysis and .ruga metadata generation",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Add CORS middleware
@@ -106,6 +123,41 @@ app.add_middleware(
 )
 
 
+async def _validate_dir(path_str: str, label: str = "Root path") -> Path:
+    """
+    Check that path_str is an existing directory and return it as a Path.
+    
+    Uses a single os.stat run in a worker thread, so slow filesystems do not
+    block the event loop.
+    """
+    try:
+        st = await asyncio.to_thread(os.stat, path_str)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail=f"{label} does not exist: {path_str}")
+    except PermissionError:
+        raise HTTPException(status_code=403, detail=f"Permission denied: {path_str}")
+    if not stat.S_ISDIR(st.st_mode):
+        raise HTTPException(status_code=400, detail=f"Path is not a directory: {path_str}")
+    return Path(path_str)
+
+
+async def _validate_file(path_str: str) -> Path:
+    """
+    Check that path_str is an existing regular file and return it as a Path.
+    
+    Uses a single os.stat run in a worker thread, like _validate_dir.
+    """
+    try:
+        st = await asyncio.to_thread(os.stat, path_str)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail=f"File not found: {path_str}")
+    except PermissionError:
+        raise HTTPException(status_code=403, detail=f"Permission denied: {path_str}")
+    if not stat.S_ISREG(st.st_mode):
+        raise HTTPException(status_code=400, detail=f"Path is not a file: {path_str}")
+    return Path(path_str)
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -114,6 +166,7 @@ async def root():
         "version": "0.1.0",
         "endpoints": {
             "GET /files": "List all files and folders with .ruga status",
+            "GET /files/stream": "Stream the file listing as NDJSON (large trees)",
             "POST /analyze/folder": "Start analyzing a folder",
             "POST /analyze/file": "Start analyzing a single file",
             "GET /jobs": "List all analysis jobs (folder and file jobs)",
@@ -134,20 +187,33 @@ async def list_files(root_path: str):
     Returns whether each file has a .ruga file associated, and if so, returns the content.
     """
     try:
-        root = Path(root_path)
-        if not root.exists():
-            raise HTTPException(status_code=404, detail=f"Root path does not exist: {root_path}")
-        if not root.is_dir():
-            raise HTTPException(status_code=400, detail=f"Path is not a directory: {root_path}")
-        
-        files = await file_service.list_files_recursive(root)
-        return FileListResponse(root_path=str(root.absolute()), files=files)
+        root = await _validate_dir(root_path)
+        
+        # Serialized body comes from the file service cache (skips re-validation)
+        body = await file_service.list_files_json(root)
+        return Response(content=body, media_type="application/json")
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing files: {str(e)}")
 
 
+@app.get("/files/stream")
+async def stream_files(root_path: str):
+    """
+    Stream all files and folders recursively from a root path as NDJSON.
+    
+    Same entries as GET /files, one JSON object per line, sent while the tree
+    is being walked. Use this for large roots where the full listing would be
+    slow to build and serialize.
+    """
+    root = await _validate_dir(root_path)
+    return StreamingResponse(
+        file_service.iter_files_ndjson(root),
+        media_type="application/x-ndjson",
+    )
+
+
 @app.post("/analyze/folder", response_model=AnalyzeResponse)
 async def analyze_folder(request: AnalyzeFolderRequest):
     """
@@ -156,67 +222,58 @@ async def analyze_folder(request: AnalyzeFolderRequest):
     Analyzes all files in the root_path that don't have .ruga files.
     """
     try:
-        root = Path(request.root_path)
-        if not root.exists():
-            raise HTTPException(status_code=404, detail=f"Root path does not exist: {request.root_path}")
-        if not root.is_dir():
-            raise HTTPException(status_code=400, detail=f"Path is not a directory: {request.root_path}")
-        
-        # Get all files without .ruga
-        files_to_analyze = await file_service.get_files_without_ruga(root)
+        root = await _validate_dir(request.root_path)
+        root_abs = str(root.absolute())
         
-        # Debug: Check total files vs files without ruga
-        all_files = list(root.rglob('*'))
-        all_regular_files = [f for f in all_files if f.is_file() and f.suffix != '.ruga']
+        # Get all files without .ruga (the same walk counts all regular files)
+        files_to_analyze, total_regular = await file_service.get_files_without_ruga(root)
         
         if not files_to_analyze:
             # Check if there are any files at all
-            if not all_regular_files:
+            if not total_regular:
                 message = "No files found in folder"
             else:
                 # All files already have .ruga metadata
-                message = f"Found {len(all_regular_files)} file(s), but all already have .ruga metadata"
+                message = f"Found {total_regular} file(s), but all already have .ruga metadata"
             
             # Create job even if no files to analyze
             job_id = job_service.create_job(
                 job_type=JobType.FOLDER,
-                root_path=str(root.absolute()),
-                target_path=str(root.absolute()),
+                root_path=root_abs,
+                target_path=root_abs,
                 file_paths=[],
             )
             return AnalyzeResponse(
                 job_id=job_id,
                 message=message,
                 job_type=JobType.FOLDER,
-                root_path=str(root.absolute()),
-                target_path=str(root.absolute()),
+                root_path=root_abs,
+                target_path=root_abs,
                 files_queued=0,
                 file_paths=[],
             )
         
         # Create job
-        queued_paths = [str(f.relative_to(root)) for f in files_to_analyze]
+        root_str = str(root)
+        queued_paths = [relpath_fast(root_str, str(f)) for f in files_to_analyze]
         job_id = job_service.create_job(
             job_type=JobType.FOLDER,
-            root_path=str(root.absolute()),
-            target_path=str(root.absolute()),
+            root_path=root_abs,
+            target_path=root_abs,
             file_paths=queued_paths,
         )
         
         # Queue files for analysis with job_id
-        for file_path in files_to_analyze:
-            analysis_service.queue_file_analysis(root, file_path, job_id=job_id)
-        
-        # Start background processing if not already running
-        if analysis_service.processing_task is None or analysis_service.processing_task.done():
-            analysis_service.processing_task = asyncio.create_task(analysis_service.process_queue())
+        analysis_service.queue_files_bulk(
+            root, files_to_analyze, job_id=job_id, root_abs_str=root_abs
+        )
         
         return AnalyzeResponse(
             job_id=job_id,
             message=f"Queued {len(queued_paths)} file(s) for analysis",
             job_type=JobType.FOLDER,
-            root_path=str(root.absolute()),
-            target_path=str(root.absolute()),
+            root_path=root_abs,
+            target_path=root_abs,
             files_queued=len(queued_paths),
             file_paths=queued_paths,
         )
@@ -235,21 +292,13 @@ async def analyze_file(request: AnalyzeFileRequest):
     the parent directory of the file will be used as the root.
     """
     try:
-        file_path = Path(request.absolute_path)
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail=f"File not found: {request.absolute_path}")
-        if not file_path.is_file():
-            raise HTTPException(status_code=400, detail=f"Path is not a file: {request.absolute_path}")
+        file_path = await _validate_file(request.absolute_path)
         if file_path.suffix == ".ruga":
             raise HTTPException(status_code=400, detail="Cannot analyze .ruga files")
         
         # Determine root path
         if request.root_path:
-            root = Path(request.root_path)
-            if not root.exists():
-                raise HTTPException(status_code=404, detail=f"Root path does not exist: {request.root_path}")
-            if not root.is_dir():
-                raise HTTPException(status_code=400, detail=f"Root path is not a directory: {request.root_path}")
+            root = await _validate_dir(request.root_path)
             # Verify file is within root
             try:
                 rel_path = str(file_path.relative_to(root))
@@ -262,27 +311,26 @@ async def analyze_file(request: AnalyzeFileRequest):
             # Use parent directory as root
             root = file_path.parent
             rel_path = file_path.name
+        root_abs = str(root.absolute())
         
         # Create job
         job_id = job_service.create_job(
             job_type=JobType.FILE,
-            root_path=str(root.absolute()),
+            root_path=root_abs,
             target_path=rel_path,
             file_paths=[rel_path],
         )
         
         # Queue file for analysis with job_id
-        analysis_service.queue_file_analysis(root, file_path, job_id=job_id)
-        
-        # Start background processing if not already running
-        if analysis_service.processing_task is None or analysis_service.processing_task.done():
-            analysis_service.processing_task = asyncio.create_task(analysis_service.process_queue())
+        await analysis_service.queue_file_analysis(
+            root, file_path, job_id=job_id, root_abs_str=root_abs
+        )
         
         return AnalyzeResponse(
             job_id=job_id,
             message=f"Queued file for analysis",
             job_type=JobType.FILE,
-            root_path=str(root.absolute()),
+            root_path=root_abs,
             target_path=rel_path,
             files_queued=1,
             file_paths=[rel_path],
@@ -347,11 +395,7 @@ async def generate_folder_structure(request: GenerateStructureRequest):
     - root_path: Path to the root directory containing .ruga files
     """
     try:
-        root = Path(request.root_path)
-        if not root.exists():
-            raise HTTPException(status_code=404, detail=f"Root path does not exist: {request.root_path}")
-        if not root.is_dir():
-            raise HTTPException(status_code=400, detail=f"Path is not a directory: {request.root_path}")
+        root = await _validate_dir(request.root_path)
         
         # Generate structure
         structure_id, structure = await folder_org_service.generate_folder_structure(root)
@@ -397,15 +441,17 @@ async def apply_folder_structure(request: ApplyStructureRequest):
         if not original_root_str:
             raise HTTPException(status_code=404, detail=f"Root path not found for structure: {structure_id}")
         
-        original_root = Path(original_root_str)
-        if not original_root.exists():
-            raise HTTPException(status_code=404, detail=f"Original root path no longer exists: {original_root_str}")
+        original_root = await _validate_dir(original_root_str, "Original root path")
         
         # Apply structure
         new_root_path, files_copied, folders_created, errors = await folder_org_service.apply_folder_structure(
             structure_id, original_root, dry_run=request.dry_run
         )
         
+        # New files were written: drop cached listings that include them
+        if not request.dry_run and new_root_path:
+            file_service.invalidate_cache(Path(new_root_path))
+        
         return ApplyStructureResponse(
             structure_id=structure_id,
             new_root_path=new_root_path,
@@ -440,11 +486,7 @@ async def organize_all(request: OrganizeAllRequest):
     analysis_status = "unknown"
     
     try:
-        root = Path(request.root_path)
-        if not root.exists():
-            raise HTTPException(status_code=404, detail=f"Root path does not exist: {request.root_path}")
-        if not root.is_dir():
-            raise HTTPException(status_code=400, detail=f"Path is not a directory: {request.root_path}")
+        root = await _validate_dir(request.root_path)
         
         # Step 1: Analyze folder
         try:
@@ -455,26 +497,21 @@ async def organize_all(request: OrganizeAllRequest):
             
             # Wait for analysis to complete if requested
             if request.wait_for_analysis and files_analyzed > 0:
-                import time
-                start_time = time.time()
-                while time.time() - start_time < request.max_wait_seconds:
-                    job = await job_service.get_job(analysis_job_id)
+                try:
+                    # Woken by the job service as soon as the job finishes
+                    job = await asyncio.wait_for(
+                        job_service.wait_for_job(analysis_job_id),
+                        timeout=request.max_wait_seconds,
+                    )
                     if not job:
                         errors.append("Analysis job not found")
-                        break
-                    
-                    if job.status == AnalysisStatus.ANALYZED:
+                    elif job.status == AnalysisStatus.ANALYZED:
                         analysis_status = "analyzed"
-                        break
                     elif job.status == AnalysisStatus.ERROR:
                         analysis_status = "error"
                         if job.error_message:
                             errors.append(f"Analysis error: {job.error_message}")
-                        break
-                    
-                    # Wait a bit before checking again
-                    await asyncio.sleep(2)
-                else:
+                except asyncio.TimeoutError:
                     # Timeout
                     analysis_status = "timeout"
                     errors.append(f"Analysis did not complete within {request.max_wait_seconds} seconds")
@@ -525,6 +562,11 @@ async def organize_all(request: OrganizeAllRequest):
         raise HTTPException(status_code=500, detail=f"Error in organize all: {str(e)}")
 
 
+def _sse_frame(data: Dict[str, Any]) -> bytes:
+    """Format a payload as a single Server-Sent Events frame (pre-encoded bytes)."""
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
+
 @app.post("/chat")
 async def chat(request: ChatRequest):
     """
@@ -560,64 +602,79 @@ async def chat(request: ChatRequest):
         async def generate_stream():
             """Generate streaming response from agent."""
             try:
-                # Run agent.stream in executor since it's synchronous
-                loop = asyncio.get_event_loop()
+                # Run agent.stream in executor since it's synchronous, and
+                # hand each step over through a bounded queue as it arrives
+                loop = asyncio.get_running_loop()
+                queue: asyncio.Queue = asyncio.Queue(maxsize=32)
+                stop = threading.Event()
                 
                 def run_agent():
                     """Run agent stream synchronously in executor."""
-                    steps = []
-                    for step in agent.stream(
-                        {"messages": messages},
-                        stream_mode="values",
-                    ):
-                        steps.append(step)
-                    return steps
+                    try:
+                        for step in agent.stream(
+                            {"messages": messages},
+                            stream_mode="values",
+                        ):
+                            # Client went away: stop pulling further steps
+                            if stop.is_set():
+                                break
+                            # Blocks while the queue is full (backpressure)
+                            asyncio.run_coroutine_threadsafe(queue.put(step), loop).result()
+                    finally:
+                        asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
                 
                 # Execute in thread pool
-                steps = await loop.run_in_executor(None, run_agent)
+                producer = loop.run_in_executor(None, run_agent)
                 
-                # Stream the results
-                for step in steps:
-                    messages_list = step.get("messages", [])
-                    if messages_list:
-                        last_message = messages_list[-1]
-                        
-                        # Extract content from message
-                        content = ""
-                        msg_type = "ai"
+                # Stream the results as they are produced
+                try:
+                    while True:
+                        step = await queue.get()
+                        if step is None:
+                            break
                         
-                        # Handle different message types
-                        if hasattr(last_message, 'content'):
-                            content = last_message.content or ""
-                            if hasattr(last_message, 'type'):
-                                msg_type = last_message.type
-                        elif isinstance(last_message, dict):
-                            content = last_message.get("content", "")
-                            msg_type = last_message.get("type", "ai")
-                        else:
-                            content = str(last_message)
-                        
-                        # Only send non-empty content
-                        if content:
-                            # Format as JSON for SSE
-                            data = {
-                                "type": msg_type,
-                                "content": content,
-                            }
+                        messages_list = step.get("messages", [])
+                        if messages_list:
+                            last_message = messages_list[-1]
+                            
+                            # Extract content from message
+                            content = ""
+                            msg_type = "ai"
                             
-                            # Send as SSE
-                            yield f"data: {json.dumps(data)}\n\n"
+                            # Handle different message types
+                            if hasattr(last_message, 'content'):
+                                content = last_message.content or ""
+                                if hasattr(last_message, 'type'):
+                                    msg_type = last_message.type
+                            elif isinstance(last_message, dict):
+                                content = last_message.get("content", "")
+                                msg_type = last_message.get("type", "ai")
+                            else:
+                                content = str(last_message)
+                            
+                            # Only send non-empty content
+                            if content:
+                                # Send as SSE
+                                yield _sse_frame({
+                                    "type": msg_type,
+                                    "content": content,
+                                })
+                finally:
+                    # On disconnect/cancellation, tell the producer to stop and
+                    # free queue slots so a blocked put can complete
+                    stop.set()
+                    while not queue.empty():
+                        queue.get_nowait()
+                
+                # Surface any error raised by the agent run
+                await producer
                 
                 # Send done signal
-                yield f"data: {json.dumps({'type': 'done'})}\n\n"
+                yield _sse_frame({"type": "done"})
                 
             except Exception as e:
                 # Send error
-                error_data = {
-                    "type": "error",
-                    "content": str(e),
-                }
-                yield f"data: {json.dumps(error_data)}\n\n"
+                yield _sse_frame({"type": "error", "content": str(e)})
         
         # Return streaming response
         return StreamingResponse(
@@ -638,4 +695,6 @@ async def chat(request: ChatRequest):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Spawned extraction processes re-import this script as __mp_main__; that
+    # only costs the imports above, since services are created in lifespan
+    uvicorn.run("main:app", host="0.0.0.0", port=8000)
@@ -3,9 +3,17 @@ Service for file analysis operations.
 """
 
 from pathlib import Path
-from typing import Dict, Optional, Set
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+from uuid import uuid4
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import asyncio
-from datetime import datetime
+import multiprocessing
+import os
+from datetime import datetime, timezone
+from functools import partial
+import hashlib
 
 # Import from examples
 import sys
@@ -19,171 +27,400 @@ BACKEND_DIR = Path(__file__).parent.parent
 if str(BACKEND_DIR) not in sys.path:
     sys.path.insert(0, str(BACKEND_DIR))
 
-from ruga_file_handler import has_ruga_metadata, save_ruga_metadata
+from ruga_file_handler import has_ruga_metadata, load_ruga_metadata, save_ruga_metadata
+from content_extraction import get_file_content
 from process_folder import process_file_for_metadata
 from models.schemas import AnalysisStatus
 from services.vector_store_service import VectorStoreService
+from services.file_service import relpath_fast
+
+
+# Number of files analyzed concurrently (bounded to respect provider rate limits)
+DEFAULT_ANALYSIS_WORKERS = 8
+
+# Maximum number of queued files held in memory; producers wait when full
+QUEUE_MAXSIZE = 4096
+
+# Job status updates a worker buffers before flushing them in one call
+JOB_UPDATE_BATCH = 64
+
+# Processes for CPU-bound content extraction (each loads its own Docling models)
+EXTRACTION_PROCESSES = min(4, os.cpu_count() or 1)
+
+
+def _create_extract_executor() -> ProcessPoolExecutor:
+    """
+    Create the process pool for content extraction.
+    
+    Docling conversion is CPU-bound Python: run it in separate processes so
+    concurrent workers are not serialized on the GIL. "spawn" avoids forking
+    a process that already runs threads and an event loop; the children only
+    import the side-effect-free content_extraction module.
+    """
+    return ProcessPoolExecutor(
+        max_workers=EXTRACTION_PROCESSES,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
 
 
 class AnalysisService:
     """Service for managing file analysis tasks."""
     
-    def __init__(self, job_service=None, vector_store_service=None):
+    def __init__(
+        self,
+        job_service=None,
+        vector_store_service=None,
+        file_service=None,
+        num_workers: int = DEFAULT_ANALYSIS_WORKERS,
+    ):
         """Initialize the analysis service."""
-        # Track status: root_path -> file_path -> status
-        self.status: Dict[str, Dict[str, AnalysisStatus]] = {}
-        # Track errors: root_path -> file_path -> error_message
-        self.errors: Dict[str, Dict[str, str]] = {}
-        # Queue of files to process: (job_id, root_path, file_path, rel_path)
-        self.queue: list[tuple[Optional[str], Path, Path, str]] = []
-        # Set of files currently being processed
-        self.processing: Set[tuple[str, str]] = set()
-        # Lock for thread safety
-        self.lock = asyncio.Lock()
-        # Background task running flag
-        self.processing_task: Optional[asyncio.Task] = None
+        # Track status: (root_path, file_path) -> status
+        self.status: Dict[tuple[str, str], AnalysisStatus] = {}
+        # Track errors: (root_path, file_path) -> error_message
+        self.errors: Dict[tuple[str, str], str] = {}
+        # Jobs that queued a file while another worker was analyzing it:
+        # (root_path, file_path) -> job ids that get the final result too
+        self.waiting_jobs: Dict[tuple[str, str], Set[str]] = {}
+        # Queue of files to process: (job_id, root_str, file_path, rel_path)
+        self.queue: asyncio.Queue[tuple[Optional[str], str, Path, str]] = asyncio.Queue(
+            maxsize=QUEUE_MAXSIZE
+        )
+        # Background tasks feeding bulk submissions into the queue
+        self.producers: Set[asyncio.Task] = set()
+        # Locks striped by root path: analyses of different roots never contend.
+        # Created on first use; defaultdict access has no await, so this is safe
+        # on the single event loop without a bootstrap lock.
+        self._locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # Worker tasks consuming the queue (started by start_workers)
+        self.num_workers = num_workers
+        self.workers: List[asyncio.Task] = []
+        # Dedicated threads for the blocking analysis (not the shared default executor)
+        self.executor = ThreadPoolExecutor(
+            max_workers=num_workers, thread_name_prefix="analysis"
+        )
+        # Processes for content extraction (replaced if a worker process dies)
+        self.extract_executor = _create_extract_executor()
         # Job service reference
         self.job_service = job_service
         # Vector store service reference
         self.vector_store_service = vector_store_service
+        # File service reference (listing cache is invalidated on new .ruga files)
+        self.file_service = file_service
     
-    def queue_file_analysis(
-        self, root_path: Path, file_path: Path, job_id: Optional[str] = None
+    async def queue_file_analysis(
+        self,
+        root_path: Path,
+        file_path: Path,
+        job_id: Optional[str] = None,
+        root_abs_str: Optional[str] = None,
     ):
         """
-        Queue a file for analysis.
+        Queue a file for analysis (waits if the queue is full).
         
         Args:
             root_path: Root directory path
             file_path: Full path to the file to analyze
             job_id: Optional job ID to track this file
+            root_abs_str: Absolute root path string, if the caller already has it
         """
-        root_str = str(root_path.absolute())
-        rel_path = str(file_path.relative_to(root_path))
-        
-        # Initialize status tracking for this root if needed
-        if root_str not in self.status:
-            self.status[root_str] = {}
-            self.errors[root_str] = {}
+        root_str = root_abs_str or str(root_path.absolute())
+        rel_path = relpath_fast(str(root_path), str(file_path))
+        key = (root_str, rel_path)
         
-        # Set status to pending
-        self.status[root_str][rel_path] = AnalysisStatus.PENDING
+        # Set status to pending (unless a worker is analyzing it right now)
+        if self.status.get(key) != AnalysisStatus.IN_PROCESS:
+            self.status[key] = AnalysisStatus.PENDING
         
         # Add to queue with job_id
-        self.queue.append((job_id, root_path, file_path, rel_path))
+        await self.queue.put((job_id, root_str, file_path, rel_path))
     
-    async def process_queue(self):
-        """Process the queue of files to analyze. Runs continuously."""
+    def queue_files_bulk(
+        self,
+        root_path: Path,
+        file_paths: List[Path],
+        job_id: Optional[str] = None,
+        root_abs_str: Optional[str] = None,
+    ):
+        """
+        Queue many files under the same root for analysis in one call.
+        
+        Statuses are set to pending immediately; the entries are fed into the
+        bounded queue by a background task so the caller returns right away
+        and large folders never sit in the queue all at once.
+        
+        Args:
+            root_path: Root directory path
+            file_paths: Full paths to the files to analyze
+            job_id: Optional job ID to track these files
+            root_abs_str: Absolute root path string, if the caller already has it
+        """
+        root_str = root_abs_str or str(root_path.absolute())
+        root_path_str = str(root_path)
+        status = self.status
+        
+        entries = []
+        for file_path in file_paths:
+            rel_path = relpath_fast(root_path_str, str(file_path))
+            key = (root_str, rel_path)
+            if status.get(key) != AnalysisStatus.IN_PROCESS:
+                status[key] = AnalysisStatus.PENDING
+            entries.append((job_id, root_str, file_path, rel_path))
+        
+        # Keep a reference so the producer task is not garbage collected
+        producer = asyncio.create_task(self._enqueue_all(entries))
+        self.producers.add(producer)
+        producer.add_done_callback(self.producers.discard)
+    
+    async def _enqueue_all(self, entries: List[tuple[Optional[str], str, Path, str]]):
+        """Feed entries into the queue, waiting whenever workers fall behind."""
+        for entry in entries:
+            await self.queue.put(entry)
+    
+    def start_workers(self):
+        """Start the queue workers. Must be called from the running event loop."""
+        if not self.workers:
+            self.workers = [
+                asyncio.create_task(self.worker()) for _ in range(self.num_workers)
+            ]
+    
+    async def worker(self):
+        """Process files from the queue. Runs continuously; several run concurrently."""
+        loop = asyncio.get_running_loop()
+        # Buffered job status updates: job_id -> [(rel_path, status, error)]
+        job_updates: Dict[str, List[tuple[str, AnalysisStatus, Optional[str]]]] = {}
         while True:
-            async with self.lock:
-                if not self.queue:
-                    # No files to process, wait a bit
-                    await asyncio.sleep(1)
-                    continue
-                
-                # Get next file from queue
-                job_id, root_path, file_path, rel_path = self.queue.pop(0)
-                root_str = str(root_path.absolute())
-                key = (root_str, rel_path)
-            
-            # Skip if already processing or analyzed
-            if key in self.processing:
-                continue
-            
-            # Check if already has .ruga file
-            if has_ruga_metadata(file_path):
-                async with self.lock:
-                    if root_str not in self.status:
-                        self.status[root_str] = {}
-                    self.status[root_str][rel_path] = AnalysisStatus.ANALYZED
-                
-                # Update job if exists
-                if job_id and self.job_service:
-                    await self.job_service.update_job_file_status(
-                        job_id, rel_path, AnalysisStatus.ANALYZED
-                    )
-                continue
-            
-            # Mark as processing
-            async with self.lock:
-                self.processing.add(key)
-                if root_str not in self.status:
-                    self.status[root_str] = {}
-                self.status[root_str][rel_path] = AnalysisStatus.IN_PROCESS
+            # Suspends until a file is queued (no polling)
+            job_id, root_str, file_path, rel_path = await self.queue.get()
+            try:
+                await self._process_file(
+                    loop, job_id, root_str, file_path, rel_path, job_updates
+                )
+                # Flush once enough updates piled up, or when there is no more work
+                if job_updates and (
+                    sum(map(len, job_updates.values())) >= JOB_UPDATE_BATCH
+                    or self.queue.empty()
+                ):
+                    await self._flush_job_updates(job_updates)
+            except Exception as e:
+                # Keep the worker alive: one bad item must not shrink the pool
+                print(f"❌ Analysis worker error for {rel_path}: {e}")
+            finally:
+                self.queue.task_done()
+    
+    async def _flush_job_updates(
+        self, job_updates: Dict[str, List[tuple[str, AnalysisStatus, Optional[str]]]]
+    ):
+        """Send buffered job status updates to the job service, one call per job."""
+        if not self.job_service:
+            job_updates.clear()
+            return
+        for job_id, updates in list(job_updates.items()):
+            del job_updates[job_id]
+            await self.job_service.update_job_file_statuses(job_id, updates)
+    
+    async def _process_file(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        job_id: Optional[str],
+        root_str: str,
+        file_path: Path,
+        rel_path: str,
+        job_updates: Dict[str, List[tuple[str, AnalysisStatus, Optional[str]]]],
+    ):
+        """
+        Analyze a single queued file and record its status.
+        
+        Files that already have a .ruga file only add their job update to
+        job_updates (flushed in batches by the worker); real analyses flush
+        the buffer and report their own job updates right away.
+        """
+        root_path = Path(root_str)
+        key = (root_str, rel_path)
+        
+        # Check if already has .ruga file
+        if await asyncio.to_thread(has_ruga_metadata, file_path):
+            async with self._locks[root_str]:
+                self.status[key] = AnalysisStatus.ANALYZED
             
-            # Update job status to in_process
-            if job_id and self.job_service:
-                await self.job_service.update_job_file_status(
-                    job_id, rel_path, AnalysisStatus.IN_PROCESS
+            # Buffer the job update; the worker flushes it in a batch
+            if job_id:
+                job_updates.setdefault(job_id, []).append(
+                    (rel_path, AnalysisStatus.ANALYZED, None)
                 )
+            return
+        
+        # Claim the file by marking it in process. Status is only mutated on
+        # the event loop and there is no await between check and set, so a
+        # duplicate entry picked up by another worker is skipped here; its job
+        # gets the result of the running analysis.
+        if self.status.get(key) == AnalysisStatus.IN_PROCESS:
+            if job_id:
+                self.waiting_jobs.setdefault(key, set()).add(job_id)
+            return
+        self.status[key] = AnalysisStatus.IN_PROCESS
+        
+        # Don't hold earlier updates back while this file is being analyzed
+        if job_updates:
+            await self._flush_job_updates(job_updates)
+        
+        # Update job status to in_process
+        if job_id and self.job_service:
+            await self.job_service.update_job_file_status(
+                job_id, rel_path, AnalysisStatus.IN_PROCESS
+            )
+        
+        # Process in background (run in executors to avoid blocking)
+        try:
+            # Same content analyzed before (a copy, or a removed .ruga file):
+            # reuse that analysis instead of extracting and calling the LLM
+            content = None
+            result = await loop.run_in_executor(
+                self.executor, self._reuse_analysis, file_path
+            )
             
-            # Process in background (run in executor to avoid blocking)
-            try:
-                # Run the synchronous processing function in a thread pool
-                loop = asyncio.get_event_loop()
+            if result is None:
+                # Extract content in the process pool (CPU-bound)
+                content = await self._extract_content(loop, file_path)
+                
+                # Run the LLM analysis (I/O-bound) in the thread pool
                 result = await loop.run_in_executor(
-                    None,
+                    self.executor,
                     process_file_for_metadata,
                     file_path,
                     root_path,
+                    content,
                 )
+            
+            if result:
+                # Success
+                async with self._locks[root_str]:
+                    self.status[key] = AnalysisStatus.ANALYZED
+                    self.errors.pop(key, None)
                 
-                async with self.lock:
-                    if result:
-                        # Success
-                        self.status[root_str][rel_path] = AnalysisStatus.ANALYZED
-                        if root_str in self.errors and rel_path in self.errors[root_str]:
-                            del self.errors[root_str][rel_path]
-                        
-                        # Add to vector store
-                        if self.vector_store_service:
-                            try:
-                                # Convert FinalFileRecord to dict for metadata
-                                metadata = result.model_dump(mode='json')
-                                self.vector_store_service.add_document(
-                                    file_path=file_path,
-                                    root_path=root_path,
-                                    metadata=metadata,
-                                )
-                            except Exception as e:
-                                print(f"  ⚠️  Error adding to vector store: {e}")
-                        
-                        # Update job
-                        if job_id and self.job_service:
-                            await self.job_service.update_job_file_status(
-                                job_id, rel_path, AnalysisStatus.ANALYZED
-                            )
-                    else:
-                        # Failed
-                        error_msg = "Processing returned None"
-                        self.status[root_str][rel_path] = AnalysisStatus.ERROR
-                        if root_str not in self.errors:
-                            self.errors[root_str] = {}
-                        self.errors[root_str][rel_path] = error_msg
-                        
-                        # Update job
-                        if job_id and self.job_service:
-                            await self.job_service.update_job_file_status(
-                                job_id, rel_path, AnalysisStatus.ERROR, error_msg
-                            )
-            except Exception as e:
-                # Error occurred
-                error_msg = str(e)
-                async with self.lock:
-                    self.status[root_str][rel_path] = AnalysisStatus.ERROR
-                    if root_str not in self.errors:
-                        self.errors[root_str] = {}
-                    self.errors[root_str][rel_path] = error_msg
+                # A new .ruga file was written: cached listings are stale
+                if self.file_service:
+                    self.file_service.invalidate_cache(file_path)
                 
-                # Update job
-                if job_id and self.job_service:
-                    await self.job_service.update_job_file_status(
-                        job_id, rel_path, AnalysisStatus.ERROR, error_msg
-                    )
-            finally:
-                # Remove from processing set
-                async with self.lock:
-                    self.processing.discard(key)
+                # Add to vector store (embedding calls and Chroma writes block,
+                # so run them in the thread pool, outside the status lock)
+                if self.vector_store_service:
+                    try:
+                        # Convert FinalFileRecord to dict for metadata
+                        metadata = result.model_dump(mode='json')
+                        await loop.run_in_executor(
+                            self.executor,
+                            partial(
+                                self.vector_store_service.add_document,
+                                file_path=file_path,
+                                root_path=root_path,
+                                metadata=metadata,
+                                content=content,
+                            ),
+                        )
+                    except Exception as e:
+                        print(f"  ⚠️  Error adding to vector store: {e}")
+                
+                # Update job (and jobs waiting on this analysis)
+                await self._report_result(key, job_id, rel_path, AnalysisStatus.ANALYZED)
+            else:
+                # Failed
+                error_msg = "Processing returned None"
+                async with self._locks[root_str]:
+                    self.status[key] = AnalysisStatus.ERROR
+                    self.errors[key] = error_msg
+                
+                # Update job (and jobs waiting on this analysis)
+                await self._report_result(key, job_id, rel_path, AnalysisStatus.ERROR, error_msg)
+        except Exception as e:
+            # Error occurred
+            error_msg = str(e)
+            async with self._locks[root_str]:
+                self.status[key] = AnalysisStatus.ERROR
+                self.errors[key] = error_msg
+            
+            # Update job (and jobs waiting on this analysis)
+            await self._report_result(key, job_id, rel_path, AnalysisStatus.ERROR, error_msg)
+    
+    async def _extract_content(self, loop: asyncio.AbstractEventLoop, file_path: Path) -> str:
+        """
+        Extract a file's content in the process pool.
+        
+        If a worker process dies (e.g. out of memory on a large PDF), the pool
+        is broken for every pending call: it is replaced and the file retried
+        once, so only a file that crashes the pool twice fails.
+        """
+        for attempt in range(2):
+            executor = self.extract_executor
+            try:
+                return await loop.run_in_executor(executor, get_file_content, file_path)
+            except BrokenProcessPool:
+                # Concurrent callers share the broken pool: replace it only once
+                if self.extract_executor is executor:
+                    print(f"⚠️  Extraction process died on {file_path.name}, restarting the pool")
+                    self.extract_executor = _create_extract_executor()
+                    executor.shutdown(wait=False, cancel_futures=True)
+                if attempt:
+                    raise
+    
+    async def _report_result(
+        self,
+        key: tuple[str, str],
+        job_id: Optional[str],
+        rel_path: str,
+        status: AnalysisStatus,
+        error_msg: Optional[str] = None,
+    ):
+        """
+        Report the final status of an analysis to its job and to every job
+        that queued the same file while it was running.
+        """
+        job_ids = self.waiting_jobs.pop(key, set())
+        if job_id:
+            job_ids.add(job_id)
+        if not self.job_service:
+            return
+        for waiting_job_id in job_ids:
+            await self.job_service.update_job_file_status(
+                waiting_job_id, rel_path, status, error_msg
+            )
+    
+    def _reuse_analysis(self, file_path: Path):
+        """
+        Copy the .ruga metadata of an indexed file with identical content.
+        
+        Args:
+            file_path: File to analyze (has no .ruga file yet)
+            
+        Returns:
+            The reused FinalFileRecord (already saved next to file_path), or None
+        """
+        if not self.vector_store_service:
+            return None
+        
+        with file_path.open("rb") as f:
+            content_hash = hashlib.file_digest(f, "sha256").hexdigest()
+        
+        for source in self.vector_store_service.find_paths_by_content_hash(content_hash):
+            try:
+                record = load_ruga_metadata(Path(source))
+            except Exception:
+                continue
+            if record and record.content_hash == content_hash:
+                # Content-derived fields carry over; file-specific ones describe this file
+                record = record.model_copy(update={
+                    "file_id": uuid4(),
+                    "original_path": str(file_path),
+                    "last_modified_date": datetime.fromtimestamp(
+                        file_path.stat().st_mtime, tz=timezone.utc
+                    ),
+                    "analysis_date": datetime.now(timezone.utc),
+                    # A byte-identical file is indexed already
+                    "possible_duplicate": True,
+                })
+                save_ruga_metadata(file_path, record)
+                print(f"  ♻️  Reused analysis of {source} for {file_path.name}")
+                return record
+        return None
     
     async def get_file_status(
         self, root_path: Path, file_path: Path
@@ -202,16 +439,17 @@ class AnalysisService:
         rel_path = str(file_path.relative_to(root_path))
         
         # Check if file has .ruga (already analyzed)
-        if has_ruga_metadata(file_path):
+        if await asyncio.to_thread(has_ruga_metadata, file_path):
             return AnalysisStatus.ANALYZED, None
         
         # Check tracked status
-        async with self.lock:
-            if root_str in self.status and rel_path in self.status[root_str]:
-                status = self.status[root_str][rel_path]
+        async with self._locks[root_str]:
+            key = (root_str, rel_path)
+            status = self.status.get(key)
+            if status is not None:
                 error_msg = None
-                if status == AnalysisStatus.ERROR and root_str in self.errors:
-                    error_msg = self.errors[root_str].get(rel_path)
+                if status == AnalysisStatus.ERROR:
+                    error_msg = self.errors.get(key)
                 return status, error_msg
         
         # Not found in tracking
@@ -219,10 +457,14 @@ class AnalysisService:
     
     async def cleanup(self):
         """Cleanup resources."""
-        # Cancel processing task if running
-        if self.processing_task and not self.processing_task.done():
-            self.processing_task.cancel()
-            try:
-                await self.processing_task
-            except asyncio.CancelledError:
-                pass
+        # Cancel producer and worker tasks
+        tasks = [*self.producers, *self.workers]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.producers.clear()
+        self.workers = []
+        
+        # Drop queued work and wait for in-flight analyses to finish
+        await asyncio.to_thread(self.executor.shutdown, wait=True, cancel_futures=True)
+        await asyncio.to_thread(self.extract_executor.shutdown, wait=True, cancel_futures=True)
@@ -2,14 +2,78 @@
 Service for managing RAG chat interactions with the vector store.
 """
 
-from typing import Optional
+from typing import Callable, List, Optional
 from langchain.tools import tool
+from langchain_core.tools import StructuredTool
 from langchain.agents import create_agent
-from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from pydantic import create_model
 from services.vector_store_service import VectorStoreService
+from services.semantic_cache import SemanticQueryCache
+from services.search_batcher import SearchBatcher
 from utils.llm_config import get_chat_llm
 
 
+# Filter tools: field -> (phrase used in results, tool description)
+FILTER_TOOL_SPECS = {
+    "category": (
+        "in category",
+        """Filter documents by category and optionally search within them.
+
+Use this tool when the user wants to find documents in a specific category
+like "Education/Capita Selecta", "Research Meeting", "Seminar", etc.
+
+Args:
+    category: The category to filter by (e.g., "Education/Capita Selecta", "Research Meeting")
+    query: Optional search query to further filter results within the category
+
+Returns:
+    Serialized context string and filtered documents""",
+    ),
+    "topic": (
+        "with topic",
+        """Filter documents by topic and optionally search within them.
+
+Use this tool when the user wants to find documents about a specific topic
+like "survival analysis", "causal inference", "machine learning", etc.
+
+Args:
+    topic: The topic to filter by (e.g., "survival analysis", "causal inference")
+    query: Optional search query to further filter results within the topic
+
+Returns:
+    Serialized context string and filtered documents""",
+    ),
+    "tag": (
+        "with tag",
+        """Filter documents by tag and optionally search within them.
+
+Use this tool when the user wants to find documents with a specific tag.
+
+Args:
+    tag: The tag to filter by
+    query: Optional search query to further filter results within the tag
+
+Returns:
+    Serialized context string and filtered documents""",
+    ),
+}
+
+
+def _serialize_docs(docs: List[Document]) -> str:
+    """Format retrieved documents as the context text passed to the model."""
+    parts = []
+    append = parts.append
+    for doc in docs:
+        metadata = doc.metadata
+        append(
+            f"Source: {metadata.get('source', 'Unknown')}\n"
+            f"File: {metadata.get('file_name', 'Unknown')}\n"
+            f"Content: {doc.page_content}"
+        )
+    return "\n\n".join(parts)
+
+
 class ChatService:
     """Service for managing chat interactions with RAG agent."""
     
@@ -22,15 +86,41 @@ class ChatService:
         """
         self.vector_store_service = vector_store_service
         self.model = get_chat_llm(temperature=0)
-        self._agent = None
+        # Tool results for repeated or near-identical searches, dropped
+        # whenever documents are added to or removed from the store
+        self.query_cache = SemanticQueryCache(vector_store_service.embeddings.embed_query)
+        vector_store_service.add_change_listener(self.query_cache.clear)
+        # Parallel retrieve_context calls share one embedding call and query
+        self.search_batcher = SearchBatcher(
+            lambda queries: vector_store_service.batch_similarity_search(queries, k=3)
+        )
+        # Build the agent once at startup so /chat requests never pay for it
+        self._agent = self._build_agent()
     
-    def _create_retrieve_tool(self, vector_store_instance: Chroma):
+    def _cached_search(self, filter_key: str, query: str, search: Callable[[], tuple]):
         """
-        Create a retrieval tool that has access to the vector store.
+        Return a tool result from the query cache, running search on a miss.
         
         Args:
-            vector_store_instance: Chroma vector store instance
+            filter_key: Tool name and filter value the result belongs to
+            query: Search query (may be empty for filter-only calls)
+            search: Function producing the (serialized, documents) result
             
+        Returns:
+            Serialized context string and documents
+        """
+        result = self.query_cache.get(query, filter_key)
+        if result is None:
+            result = search()
+            self.query_cache.put(query, filter_key, result)
+        return result
+    
+    def _create_retrieve_tool(self):
+        """
+        Create a retrieval tool that searches the vector store.
+        
+        Searches from concurrent tool calls are batched by search_batcher.
+        
         Returns:
             Tool function for retrieval
         """
@@ -45,177 +135,107 @@ class ChatService:
             Returns:
                 Serialized context string and retrieved documents
             """
-            retrieved_docs = vector_store_instance.similarity_search(query, k=3)
-            serialized = "\n\n".join(
-                (f"Source: {doc.metadata.get('source', 'Unknown')}\n"
-                 f"File: {doc.metadata.get('file_name', 'Unknown')}\n"
-                 f"Content: {doc.page_content}")
-                for doc in retrieved_docs
-            )
-            return serialized, retrieved_docs
+            def search():
+                retrieved_docs = self.search_batcher.search(query)
+                serialized = _serialize_docs(retrieved_docs)
+                return serialized, retrieved_docs
+            
+            return self._cached_search("retrieve_context", query, search)
         
         return retrieve_context
     
-    def _create_filter_by_category_tool(self):
+    def _make_filter_tool(self, kind: str, filter_fn: Callable[..., List[Document]]):
         """
-        Create a tool to filter documents by category.
+        Create a tool that filters documents by one metadata field.
         
+        Args:
+            kind: Metadata field to filter on ("category", "topic" or "tag");
+                also the name of the tool's filter argument
+            filter_fn: Vector store method filtering by that field
+            
         Returns:
-            Tool function for category filtering
+            Tool function for filtering (named filter_by_<kind>)
         """
-        @tool(response_format="content_and_artifact")
-        def filter_by_category(category: str, query: str = ""):
-            """
-            Filter documents by category and optionally search within them.
-            
-            Use this tool when the user wants to find documents in a specific category
-            like "Education/Capita Selecta", "Research Meeting", "Seminar", etc.
-            
-            Args:
-                category: The category to filter by (e.g., "Education/Capita Selecta", "Research Meeting")
-                query: Optional search query to further filter results within the category
+        phrase, description = FILTER_TOOL_SPECS[kind]
+        
+        def filter_documents(query: str = "", **filter_value):
+            value = filter_value[kind]
+            
+            def search():
+                retrieved_docs = filter_fn(
+                    **{kind: value},
+                    query=query if query else None,
+                    k=5
+                )
                 
-            Returns:
-                Serialized context string and filtered documents
-            """
-            retrieved_docs = self.vector_store_service.filter_by_category(
-                category=category,
-                query=query if query else None,
-                k=5
-            )
-            
-            if not retrieved_docs:
-                return f"No documents found in category: {category}", []
+                if not retrieved_docs:
+                    return f"No documents found {phrase}: {value}", []
+                
+                serialized = f"Found {len(retrieved_docs)} document(s) {phrase} '{value}':\n\n"
+                serialized += _serialize_docs(retrieved_docs)
+                return serialized, retrieved_docs
             
-            serialized = f"Found {len(retrieved_docs)} document(s) in category '{category}':\n\n"
-            serialized += "\n\n".join(
-                (f"Source: {doc.metadata.get('source', 'Unknown')}\n"
-                 f"File: {doc.metadata.get('file_name', 'Unknown')}\n"
-                 f"Content: {doc.page_content}")
-                for doc in retrieved_docs
-            )
-            return serialized, retrieved_docs
+            return self._cached_search(f"filter_by_{kind}:{value}", query, search)
         
-        return filter_by_category
+        args_schema = create_model(
+            f"FilterBy{kind.title()}Input",
+            **{kind: (str, ...), "query": (str, "")},
+        )
+        return StructuredTool.from_function(
+            func=filter_documents,
+            name=f"filter_by_{kind}",
+            description=description,
+            args_schema=args_schema,
+            response_format="content_and_artifact",
+        )
     
-    def _create_filter_by_topic_tool(self):
+    def _build_agent(self):
         """
-        Create a tool to filter documents by topic.
+        Create the RAG agent with its tools and system prompt.
         
         Returns:
-            Tool function for topic filtering
+            LangChain agent
         """
-        @tool(response_format="content_and_artifact")
-        def filter_by_topic(topic: str, query: str = ""):
-            """
-            Filter documents by topic and optionally search within them.
-            
-            Use this tool when the user wants to find documents about a specific topic
-            like "survival analysis", "causal inference", "machine learning", etc.
-            
-            Args:
-                topic: The topic to filter by (e.g., "survival analysis", "causal inference")
-                query: Optional search query to further filter results within the topic
-                
-            Returns:
-                Serialized context string and filtered documents
-            """
-            retrieved_docs = self.vector_store_service.filter_by_topic(
-                topic=topic,
-                query=query if query else None,
-                k=5
-            )
-            
-            if not retrieved_docs:
-                return f"No documents found with topic: {topic}", []
-            
-            serialized = f"Found {len(retrieved_docs)} document(s) with topic '{topic}':\n\n"
-            serialized += "\n\n".join(
-                (f"Source: {doc.metadata.get('source', 'Unknown')}\n"
-                 f"File: {doc.metadata.get('file_name', 'Unknown')}\n"
-                 f"Content: {doc.page_content}")
-                for doc in retrieved_docs
-            )
-            return serialized, retrieved_docs
+        # Create all tools
+        retrieve_tool = self._create_retrieve_tool()
+        filter_by_category_tool = self._make_filter_tool(
+            "category", self.vector_store_service.filter_by_category
+        )
+        filter_by_topic_tool = self._make_filter_tool(
+            "topic", self.vector_store_service.filter_by_topic
+        )
+        filter_by_tag_tool = self._make_filter_tool(
+            "tag", self.vector_store_service.filter_by_tag
+        )
         
-        return filter_by_topic
-    
-    def _create_filter_by_tag_tool(self):
-        """
-        Create a tool to filter documents by tag.
+        tools = [
+            retrieve_tool,
+            filter_by_category_tool,
+            filter_by_topic_tool,
+            filter_by_tag_tool,
+        ]
         
-        Returns:
-            Tool function for tag filtering
-        """
-        @tool(response_format="content_and_artifact")
-        def filter_by_tag(tag: str, query: str = ""):
-            """
-            Filter documents by tag and optionally search within them.
-            
-            Use this tool when the user wants to find documents with a specific tag.
-            
-            Args:
-                tag: The tag to filter by
-                query: Optional search query to further filter results within the tag
-                
-            Returns:
-                Serialized context string and filtered documents
-            """
-            retrieved_docs = self.vector_store_service.filter_by_tag(
-                tag=tag,
-                query=query if query else None,
-                k=5
-            )
-            
-            if not retrieved_docs:
-                return f"No documents found with tag: {tag}", []
-            
-            serialized = f"Found {len(retrieved_docs)} document(s) with tag '{tag}':\n\n"
-            serialized += "\n\n".join(
-                (f"Source: {doc.metadata.get('source', 'Unknown')}\n"
-                 f"File: {doc.metadata.get('file_name', 'Unknown')}\n"
-                 f"Content: {doc.page_content}")
-                for doc in retrieved_docs
-            )
-            return serialized, retrieved_docs
+        # Custom system prompt for the agent
+        prompt = (
+            "You are a helpful assistant that answers questions based on documents "
+            "that have been analyzed and indexed. You have access to several tools:\n"
+            "- retrieve_context: General semantic search across all documents\n"
+            "- filter_by_category: Filter documents by category (e.g., 'Education/Capita Selecta', 'Research Meeting')\n"
+            "- filter_by_topic: Filter documents by topic (e.g., 'survival analysis', 'causal inference')\n"
+            "- filter_by_tag: Filter documents by tag\n\n"
+            "Use the appropriate tool based on the user's query. If they mention a specific category, "
+            "topic, or tag, use the corresponding filter tool. Otherwise, use retrieve_context for general searches. "
+            "You can also combine tools - for example, filter by category first, then search within those results. "
+            "Always cite the source documents when providing answers."
+        )
         
-        return filter_by_tag
+        return create_agent(self.model, tools, system_prompt=prompt)
     
     def get_agent(self):
         """
-        Get or create the RAG agent.
+        Get the RAG agent (built once in __init__).
         
         Returns:
             LangChain agent
         """
-        if self._agent is None:
-            # Create all tools
-            retrieve_tool = self._create_retrieve_tool(self.vector_store_service.vector_store)
-            filter_by_category_tool = self._create_filter_by_category_tool()
-            filter_by_topic_tool = self._create_filter_by_topic_tool()
-            filter_by_tag_tool = self._create_filter_by_tag_tool()
-            
-            tools = [
-                retrieve_tool,
-                filter_by_category_tool,
-                filter_by_topic_tool,
-                filter_by_tag_tool,
-            ]
-            
-            # Custom system prompt for the agent
-            prompt = (
-                "You are a helpful assistant that answers questions based on documents "
-                "that have been analyzed and indexed. You have access to several tools:\n"
-                "- retrieve_context: General semantic search across all documents\n"
-                "- filter_by_category: Filter documents by category (e.g., 'Education/Capita Selecta', 'Research Meeting')\n"
-                "- filter_by_topic: Filter documents by topic (e.g., 'survival analysis', 'causal inference')\n"
-                "- filter_by_tag: Filter documents by tag\n\n"
-                "Use the appropriate tool based on the user's query. If they mention a specific category, "
-                "topic, or tag, use the corresponding filter tool. Otherwise, use retrieve_context for general searches. "
-                "You can also combine tools - for example, filter by category first, then search within those results. "
-                "Always cite the source documents when providing answers."
-            )
-            
-            self._agent = create_agent(self.model, tools, system_prompt=prompt)
-        
         return self._agent
@@ -0,0 +1,195 @@
+"""
+Cache around an embeddings provider.
+
+Repeated chat queries (and tool calls that re-embed the same query) are
+served from memory instead of calling the embedding API again. Document
+chunks are cached by content hash, in memory and optionally in SQLite, so
+re-indexing unchanged text (moved files, restarts) only sends the misses
+to the provider.
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that caches query and document embeddings in LRUs."""
+    
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_queries: int = 4096,
+        max_documents: int = 10000,
+        db_path: Optional[Path] = None,
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            embeddings: Underlying embeddings provider
+            max_queries: Maximum number of query embeddings kept in memory
+            max_documents: Maximum number of document chunk embeddings kept in memory
+            db_path: SQLite file persisting document embeddings (memory only if None)
+        """
+        self.embeddings = embeddings
+        self.model_name = str(getattr(embeddings, "model", type(embeddings).__name__))
+        self.max_queries = max_queries
+        self.max_documents = max_documents
+        # Cached query embeddings: (model, normalized text) -> vector
+        self._query_cache: OrderedDict[tuple[str, str], List[float]] = OrderedDict()
+        # Cached document embeddings: (model, sha256 of text) -> float32 vector
+        self._document_cache: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        # Calls come from executor threads (agent tools, analysis workers)
+        self._lock = threading.Lock()
+        
+        # Persistent document embeddings, shared by all threads under the lock
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path is not None:
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS emb_cache "
+                "(hash BLOB, model TEXT, vec BLOB, PRIMARY KEY (hash, model))"
+            )
+            self._db.commit()
+    
+    def _load_persisted(self, keys: List[tuple[str, str]]) -> Dict[tuple[str, str], np.ndarray]:
+        """Look up document embeddings in SQLite (the caller holds the lock)."""
+        found: Dict[tuple[str, str], np.ndarray] = {}
+        if self._db is None:
+            return found
+        
+        # Stay below SQLite's bound parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self._db.execute(
+                "SELECT hash, vec FROM emb_cache WHERE model = ? AND hash IN "
+                f"({','.join('?' * len(batch))})",
+                [self.model_name, *(bytes.fromhex(digest) for _, digest in batch)],
+            )
+            for digest, blob in rows:
+                found[(self.model_name, digest.hex())] = np.frombuffer(blob, dtype=np.float32)
+        return found
+    
+    def _store_document(self, key: tuple[str, str], vector: np.ndarray):
+        """Add a document embedding to the in-memory LRU (the caller holds the lock)."""
+        self._document_cache[key] = vector
+        if len(self._document_cache) > self.max_documents:
+            self._document_cache.popitem(last=False)
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, reusing the cached vector for repeated text."""
+        key = (self.model_name, text.strip())
+        
+        with self._lock:
+            vector = self._query_cache.get(key)
+            if vector is not None:
+                self._query_cache.move_to_end(key)
+                return vector
+        
+        vector = self.embeddings.embed_query(text)
+        
+        with self._lock:
+            self._query_cache[key] = vector
+            if len(self._query_cache) > self.max_queries:
+                self._query_cache.popitem(last=False)
+        
+        return vector
+    
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries, sending all uncached ones in one provider call.
+        
+        Results land in the query cache, so later embed_query calls for the
+        same text are served from memory.
+        """
+        keys = [(self.model_name, text.strip()) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        # Uncached key -> positions in the batch that need it
+        missing: Dict[tuple[str, str], List[int]] = {}
+        
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._query_cache.get(key)
+                if vector is not None:
+                    self._query_cache.move_to_end(key)
+                    results[i] = vector
+                else:
+                    missing.setdefault(key, []).append(i)
+        
+        if missing:
+            missing_keys = list(missing)
+            vectors = self.embeddings.embed_documents(
+                [texts[missing[key][0]] for key in missing_keys]
+            )
+            
+            with self._lock:
+                for key, vector in zip(missing_keys, vectors):
+                    self._query_cache[key] = vector
+                    if len(self._query_cache) > self.max_queries:
+                        self._query_cache.popitem(last=False)
+                    for i in missing[key]:
+                        results[i] = vector
+        
+        return results
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed documents, sending only uncached unique texts to the provider.
+        
+        Duplicate texts within the batch are embedded once, and all misses go
+        out in a single provider call (which batches requests itself).
+        Returned vectors are normalized to unit length.
+        """
+        keys = [
+            (self.model_name, hashlib.sha256(text.encode("utf-8")).hexdigest())
+            for text in texts
+        ]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        # Uncached key -> positions in the batch that need it
+        missing: Dict[tuple[str, str], List[int]] = {}
+        
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._document_cache.get(key)
+                if vector is not None:
+                    self._document_cache.move_to_end(key)
+                    results[i] = vector.tolist()
+                else:
+                    missing.setdefault(key, []).append(i)
+            
+            # Memory misses: one SQLite lookup for all of them
+            if missing:
+                for key, vector in self._load_persisted(list(missing)).items():
+                    self._store_document(key, vector)
+                    for i in missing.pop(key):
+                        results[i] = vector.tolist()
+        
+        if missing:
+            missing_keys = list(missing)
+            vectors = self.embeddings.embed_documents(
+                [texts[missing[key][0]] for key in missing_keys]
+            )
+            
+            with self._lock:
+                rows = []
+                for key, vector in zip(missing_keys, vectors):
+                    # Store unit vectors, so similarity ranking is a plain dot product
+                    vector = np.asarray(vector, dtype=np.float32)
+                    vector /= np.linalg.norm(vector) or 1.0
+                    self._store_document(key, vector)
+                    rows.append((bytes.fromhex(key[1]), key[0], vector.tobytes()))
+                    for i in missing[key]:
+                        results[i] = vector.tolist()
+                
+                if self._db is not None:
+                    self._db.executemany("INSERT OR REPLACE INTO emb_cache VALUES (?, ?, ?)", rows)
+                    self._db.commit()
+        
+        return results
@@ -3,8 +3,14 @@ Service for file operations.
 """
 
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+import asyncio
 import json
+import os
+import stat
+import time
+
+import orjson
 
 # Import from examples
 import sys
@@ -18,73 +24,387 @@ BACKEND_DIR = Path(__file__).parent.parent
 if str(BACKEND_DIR) not in sys.path:
     sys.path.insert(0, str(BACKEND_DIR))
 
-from ruga_file_handler import has_ruga_metadata, load_ruga_metadata
-from models.schemas import FileInfo
+from ruga_file_handler import load_ruga_metadata
+from models.schemas import FileInfo, FileListResponse
+
+
+# Maximum number of root listings kept in memory
+LIST_CACHE_SIZE = 16
+
+# Seconds a cached listing is reused. The root mtime only reflects top-level
+# changes, so this bounds how stale deeper changes made outside the app get.
+LIST_CACHE_TTL = 5.0
+
+# Maximum number of .ruga files read concurrently (bounds open file handles)
+RUGA_LOAD_CONCURRENCY = 32
+
+
+def _load_ruga_content(file_path: Path) -> Optional[Dict[str, Any]]:
+    """Load a file's .ruga metadata as a JSON-serializable dict, or None."""
+    metadata = load_ruga_metadata(file_path)
+    if metadata:
+        return metadata.model_dump(mode='json')
+    return None
+
+
+def _ruga_names(entries: List[os.DirEntry]) -> set[str]:
+    """Names of the .ruga sidecar files in one directory listing."""
+    return {
+        entry.name for entry in entries
+        if entry.name.endswith('.ruga') and entry.is_file()
+    }
+
+
+def walk_regular_files(root_path: Path) -> Iterator[tuple[os.DirEntry, bool]]:
+    """
+    Yield (entry, has .ruga sidecar) for every regular file below root_path.
+    
+    .ruga files themselves are skipped. Uses os.scandir so type checks come
+    from the directory read itself, and sidecars are found in the same
+    listing instead of with one stat per file. Symlinked directories are not
+    followed and unreadable directories are skipped.
+    """
+    stack = [str(root_path)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        
+        ruga_names = _ruga_names(entries)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.is_file() and not entry.name.endswith('.ruga'):
+                yield entry, (entry.name + '.ruga') in ruga_names
+
+
+def _sorted_entries(dir_path: str) -> tuple[List[os.DirEntry], set[str]]:
+    """
+    List a directory sorted by name, with the names of its .ruga sidecars.
+    
+    Returns empty results if the directory cannot be read.
+    """
+    try:
+        with os.scandir(dir_path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        return [], set()
+    return entries, _ruga_names(entries)
+
+
+def walk_sorted(root_path: Path) -> Iterator[tuple[os.DirEntry, bool]]:
+    """
+    Yield (entry, has .ruga sidecar) below root_path in sorted(rglob('*')) order.
+    
+    Each directory is read once with os.scandir and its entries sorted by
+    name; subdirectories are visited right after their own entry. Symlinked
+    directories are listed but not descended into, like rglob. Sidecars are
+    found in the same listing, so checking for them costs no extra stat.
+    """
+    entries, ruga_names = _sorted_entries(str(root_path))
+    stack = [(iter(entries), ruga_names)]
+    while stack:
+        entry = next(stack[-1][0], None)
+        if entry is None:
+            stack.pop()
+            continue
+        yield entry, (entry.name + '.ruga') in stack[-1][1]
+        if entry.is_dir(follow_symlinks=False):
+            entries, ruga_names = _sorted_entries(entry.path)
+            stack.append((iter(entries), ruga_names))
+
+
+def relpath_fast(root: str, path: str) -> str:
+    """
+    Return path relative to root by stripping the root prefix.
+    
+    For paths built from root (walks, joins), this gives the same result as
+    str(Path(path).relative_to(root)) without creating Path objects.
+    
+    Raises:
+        ValueError: If path is not under root
+    """
+    if root == os.curdir:
+        # Joined paths are normalized ("x"), scandir paths are not ("./x")
+        return path[2:] if path.startswith(os.curdir + os.sep) else path
+    prefix = root if root.endswith(os.sep) else root + os.sep
+    if not path.startswith(prefix):
+        raise ValueError(f"{path} is not under {root}")
+    return path[len(prefix):]
+
+
+def _file_info(entry: os.DirEntry, root_str: str, has_sidecar: bool) -> Optional[FileInfo]:
+    """
+    Build the FileInfo for one listed entry (without .ruga content).
+    
+    Shared by the /files listing and the NDJSON stream, so both report the
+    same fields for the same tree. Returns None for .ruga files and entries
+    that vanished or cannot be stat'ed.
+    """
+    # Skip .ruga files themselves
+    if entry.name.endswith('.ruga'):
+        return None
+    
+    # Directories need no stat: the type comes from the listing and
+    # they have no size. Other entries are stat'ed once for type and size.
+    try:
+        is_dir = entry.is_dir()
+        item_stat = None if is_dir else entry.stat()
+    except OSError:
+        return None
+    is_file = item_stat is not None and stat.S_ISREG(item_stat.st_mode)
+    
+    # Fields are built here from stat results: skip re-validation.
+    # Sidecar presence comes from the directory listing (no extra stat).
+    return FileInfo.model_construct(
+        path=relpath_fast(root_str, entry.path),
+        is_directory=is_dir,
+        has_ruga=is_file and has_sidecar,
+        ruga_content=None,
+        size=item_stat.st_size if is_file else None,
+    )
+
+
+async def _load_ruga_contents(files: List[FileInfo], ruga_items: List[tuple[int, Path]]):
+    """
+    Fill in ruga_content for files[index] from each (index, path) in ruga_items.
+    
+    The .ruga files are read concurrently in worker threads, bounded by
+    RUGA_LOAD_CONCURRENCY.
+    """
+    if not ruga_items:
+        return
+    semaphore = asyncio.Semaphore(RUGA_LOAD_CONCURRENCY)
+    
+    async def load(item: Path) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            return await asyncio.to_thread(_load_ruga_content, item)
+    
+    contents = await asyncio.gather(*(load(item) for _, item in ruga_items))
+    for (index, _), ruga_content in zip(ruga_items, contents):
+        files[index].ruga_content = ruga_content
+
+
+def _scan_directory(
+    dir_path: str, root_str: str
+) -> tuple[List[tuple[FileInfo, Optional[str]]], List[tuple[int, Path]]]:
+    """
+    List one directory for streaming, sorted by name.
+    
+    Returns (FileInfo, subdirectory to descend into or None) per entry, and
+    the entries whose .ruga content still has to be loaded, as (index, path).
+    """
+    entries, ruga_names = _sorted_entries(dir_path)
+    
+    items: List[tuple[FileInfo, Optional[str]]] = []
+    ruga_items: List[tuple[int, Path]] = []
+    for entry in entries:
+        file_info = _file_info(entry, root_str, (entry.name + '.ruga') in ruga_names)
+        if file_info is None:
+            continue
+        if file_info.has_ruga:
+            ruga_items.append((len(items), Path(entry.path)))
+        # Symlinked directories are listed but not descended into, like walk_sorted
+        subdir = entry.path if entry.is_dir(follow_symlinks=False) else None
+        items.append((file_info, subdir))
+    
+    return items, ruga_items
 
 
 class FileService:
     """Service for file listing and operations."""
     
+    def __init__(self):
+        """Initialize the file service."""
+        # Cached listings: absolute root path -> (cached at, root mtime_ns, files)
+        self._list_cache: Dict[str, tuple[float, int, List[FileInfo]]] = {}
+        # Serialized /files bodies: absolute root path -> (files, JSON bytes)
+        self._json_cache: Dict[str, tuple[List[FileInfo], bytes]] = {}
+        # Bumped by every invalidation: a listing scanned before the latest
+        # invalidation is returned but not cached
+        self._generation = 0
+    
+    def invalidate_cache(self, path: Optional[Path] = None):
+        """
+        Drop cached listings.
+        
+        Args:
+            path: A changed file or folder; every cached root containing it is
+                dropped. If omitted, the whole cache is cleared.
+        """
+        self._generation += 1
+        if path is None:
+            self._list_cache.clear()
+            self._json_cache.clear()
+            return
+        
+        path = path.absolute()
+        for root_str in list(self._list_cache):
+            root = Path(root_str)
+            if path == root or root in path.parents:
+                self._list_cache.pop(root_str, None)
+                self._json_cache.pop(root_str, None)
+    
     async def list_files_recursive(self, root_path: Path) -> List[FileInfo]:
         """
         List all files and folders recursively from root_path.
         
         Returns FileInfo for each item, including whether it has a .ruga file
-        and the content if it exists.
+        and the content if it exists. Results are cached per root and reused
+        for up to LIST_CACHE_TTL seconds while the root's mtime is unchanged
+        and no invalidation happened.
+        """
+        root_str = str(root_path.absolute())
+        now = time.monotonic()
+        generation = self._generation
+        
+        # Stat (and walk) the tree in a worker thread so the event loop stays responsive
+        root_mtime, files, ruga_items = await asyncio.to_thread(
+            self._stat_and_scan, root_path, root_str, now
+        )
+        if ruga_items is None:
+            # Cached listing is still valid
+            return files
+        
+        # Load .ruga contents concurrently in worker threads
+        await _load_ruga_contents(files, ruga_items)
+        
+        # Something changed while scanning: don't let this listing outlive it
+        if self._generation != generation:
+            return files
+        
+        # Store in cache, evicting the oldest root when full
+        self._list_cache.pop(root_str, None)
+        if len(self._list_cache) >= LIST_CACHE_SIZE:
+            self._list_cache.pop(next(iter(self._list_cache)))
+        self._list_cache[root_str] = (now, root_mtime, files)
+        
+        return files
+    
+    def _stat_and_scan(
+        self, root_path: Path, root_str: str, now: float
+    ) -> tuple[int, List[FileInfo], Optional[List[tuple[int, Path]]]]:
+        """
+        Stat root_path and walk it unless the cached listing is still valid.
+        
+        Returns (root mtime, files, .ruga items to load); the .ruga items are
+        None when the files come from the cache.
         """
-        files = []
+        root_mtime = root_path.stat().st_mtime_ns
+        cached = self._list_cache.get(root_str)
+        if cached and cached[1] == root_mtime and now - cached[0] < LIST_CACHE_TTL:
+            return root_mtime, cached[2], None
         
-        # Walk through all items recursively
-        for item in sorted(root_path.rglob('*')):
-            # Skip .ruga files themselves
-            if item.suffix == '.ruga':
+        files, ruga_items = self._scan_listing(root_path)
+        return root_mtime, files, ruga_items
+    
+    def _scan_listing(
+        self, root_path: Path
+    ) -> tuple[List[FileInfo], List[tuple[int, Path]]]:
+        """
+        Synchronous walk behind list_files_recursive.
+        
+        Returns the FileInfo entries (without .ruga content) and the files
+        whose .ruga content still has to be loaded, as (index in files, path).
+        """
+        root_str = str(root_path)
+        files: List[FileInfo] = []
+        ruga_items: List[tuple[int, Path]] = []
+        
+        for entry, has_sidecar in walk_sorted(root_path):
+            file_info = _file_info(entry, root_str, has_sidecar)
+            if file_info is None:
                 continue
-            
-            rel_path = item.relative_to(root_path)
-            
-            # Check if it has a .ruga file
-            has_ruga = False
-            ruga_content = None
-            
-            if item.is_file():
-                has_ruga = has_ruga_metadata(item)
-                if has_ruga:
-                    metadata = load_ruga_metadata(item)
-                    if metadata:
-                        # Convert to dict for JSON serialization
-                        ruga_content = metadata.model_dump(mode='json')
-            
-            file_info = FileInfo(
-                path=str(rel_path),
-                is_directory=item.is_dir(),
-                has_ruga=has_ruga,
-                ruga_content=ruga_content,
-                size=item.stat().st_size if item.is_file() else None,
-            )
+            if file_info.has_ruga:
+                ruga_items.append((len(files), Path(entry.path)))
             files.append(file_info)
         
-        return files
+        return files, ruga_items
     
-    async def get_files_without_ruga(self, root_path: Path) -> List[Path]:
+    async def list_files_json(self, root_path: Path) -> bytes:
         """
-        Get all files in root_path that don't have .ruga files.
+        Return the GET /files response body for root_path as JSON bytes.
         
-        Returns list of Path objects.
+        The body is serialized once per cached listing and reused until
+        list_files_recursive builds a new one.
         """
-        files_without_ruga = []
+        root_str = str(root_path.absolute())
+        files = await self.list_files_recursive(root_path)
+        
+        cached = self._json_cache.get(root_str)
+        if cached and cached[0] is files:
+            return cached[1]
+        
+        response = FileListResponse.model_construct(root_path=root_str, files=files)
+        body = orjson.dumps(response.model_dump())
         
+        self._json_cache.pop(root_str, None)
+        if len(self._json_cache) >= LIST_CACHE_SIZE:
+            self._json_cache.pop(next(iter(self._json_cache)))
+        self._json_cache[root_str] = (files, body)
+        
+        return body
+    
+    async def iter_files_ndjson(self, root_path: Path) -> AsyncIterator[bytes]:
+        """
+        Stream all files and folders below root_path as NDJSON lines.
+        
+        Yields one serialized FileInfo per line, in the same order as
+        list_files_recursive, without building the whole listing in memory.
+        Each directory is read in a worker thread so the event loop keeps
+        serving other requests while large trees are streamed.
+        """
+        root_str = str(root_path)
+        stack = [iter(await self._read_directory(root_str, root_str))]
+        
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+                continue
+            
+            file_info, subdir = item
+            yield orjson.dumps(file_info.model_dump()) + b"\n"
+            if subdir:
+                # Depth-first: a folder's contents follow the folder itself
+                stack.append(iter(await self._read_directory(subdir, root_str)))
+    
+    async def _read_directory(
+        self, dir_path: str, root_str: str
+    ) -> List[tuple[FileInfo, Optional[str]]]:
+        """List one directory for iter_files_ndjson, with .ruga contents loaded."""
+        items, ruga_items = await asyncio.to_thread(_scan_directory, dir_path, root_str)
+        await _load_ruga_contents([file_info for file_info, _ in items], ruga_items)
+        return items
+    
+    async def get_files_without_ruga(self, root_path: Path) -> tuple[List[Path], int]:
+        """
+        Get all files in root_path that don't have .ruga files.
+        
+        Returns a tuple of (list of Path objects without .ruga, total number of
+        regular non-.ruga files seen during the same walk). The walk runs in a
+        worker thread so the event loop stays responsive.
+        """
         try:
-            for item in root_path.rglob('*'):
-                # Skip if not a file or is a .ruga file itself
-                if not item.is_file() or item.suffix == '.ruga':
-                    continue
-                
-                # Check if .ruga metadata exists
-                if not has_ruga_metadata(item):
-                    files_without_ruga.append(item)
+            return await asyncio.to_thread(self._scan_files_without_ruga, root_path)
         except Exception as e:
             # Log error but don't fail completely
             import logging
             logging.error(f"Error scanning files in {root_path}: {e}")
+            return [], 0
+    
+    def _scan_files_without_ruga(self, root_path: Path) -> tuple[List[Path], int]:
+        """Synchronous walk behind get_files_without_ruga."""
+        files_without_ruga = []
+        total_regular = 0
+        
+        for entry, has_ruga in walk_regular_files(root_path):
+            total_regular += 1
+            
+            # Sidecar presence comes from the directory listing (no extra stat)
+            if not has_ruga:
+                files_without_ruga.append(Path(entry.path))
         
-        return files_without_ruga
+        return files_without_ruga, total_regular
@@ -5,9 +5,17 @@ Service for organizing folders using LLM-structured output.
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from uuid import UUID, uuid4
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+import asyncio
+import errno
 import json
+import os
+import shutil
 import sys
 
+import orjson
+
 # Import from examples
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 EXAMPLES_DIR = PROJECT_ROOT / "examples"
@@ -22,10 +30,145 @@ if str(BACKEND_DIR) not in sys.path:
 from ruga_file_handler import load_ruga_metadata, find_all_ruga_files
 from langchain_core.prompts import ChatPromptTemplate
 from models.folder_structure_schemas import FolderStructure, FileMove
-from services.vector_store_service import VectorStoreService
+from services.vector_store_service import VectorStoreService, VectorStoreWriteError
 from utils.llm_config import get_chat_llm
 
 
+# Maximum number of .ruga files read concurrently (bounds open file handles)
+RUGA_LOAD_CONCURRENCY = 32
+
+# Threads copying files when a structure is applied
+COPY_WORKERS = 8
+
+# Prompt for generate_folder_structure, parsed once at import. Only the file
+# list and count vary; they are template variables, so braces in the JSON are
+# never parsed as placeholders.
+FOLDER_STRUCTURE_SYSTEM_PROMPT = """You are an expert at organizing academic documents and presentations for a medical department.
+
+Your task is to analyze file metadata and suggest an organized folder structure that:
+- Groups files by category (Education/Capita Selecta, Education/Course, Research Meeting, Seminar, Workshop, Miscellaneous)
+- Organizes by academic year when dates are available
+- Uses clear, descriptive folder names
+- You can decide to give a different name to the file based on the summary, suggested_filename, title, topics, tags, etc.
+- Avoids deep nesting (max 3-4 levels)
+- Keeps related files together
+- If duplicates are found, move the duplicate to the original file's folder with a suffix indicating the duplicate number.
+
+For each file, suggest where it should be moved based on:
+- Its categories (primary organization)
+- Creation or modification dates (for year-based organization)
+- Topics and tags (for subcategorization)
+
+The files are given as a JSON array with one object per file. The summary is
+truncated, and fields without a value are omitted.
+
+Return a structured folder organization with:
+1. A root folder name (descriptive, e.g., "Organized_Documents")
+2. List of all folders to create
+3. List of file moves (source -> destination)
+4. Brief rationale for the organization"""
+
+FOLDER_STRUCTURE_HUMAN_PROMPT = """Analyze the following files and their metadata, then suggest an organized folder structure.
+
+Files:
+{files_json}
+
+Generate a folder structure that organizes these {file_count} files logically by category and year."""
+
+FOLDER_STRUCTURE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", FOLDER_STRUCTURE_SYSTEM_PROMPT),
+    ("human", FOLDER_STRUCTURE_HUMAN_PROMPT),
+])
+
+
+# Linux ioctl that makes dst share src's data blocks (Btrfs, XFS, ...)
+FICLONE = 0x40049409
+# Errors meaning clones are unsupported between two devices (not per-file failures)
+_NO_CLONE_ERRNOS = {errno.EOPNOTSUPP, errno.EXDEV, errno.ENOTTY, errno.EINVAL}
+# (source st_dev, destination st_dev) pairs where FICLONE is unsupported
+_NO_CLONE_DEVICES: set[tuple[int, int]] = set()
+
+
+def _fast_copy(source_path: Path, dest_path: Path):
+    """
+    Copy a file with its metadata, like shutil.copy2.
+    
+    On Linux a copy-on-write clone is tried first, which finishes without
+    copying any data on filesystems that support reflinks. Otherwise this
+    falls back to shutil.copy2 (which already copies in-kernel via sendfile).
+    """
+    if sys.platform.startswith("linux"):
+        devices = (os.stat(source_path).st_dev, os.stat(dest_path.parent).st_dev)
+        if devices not in _NO_CLONE_DEVICES:
+            import fcntl
+            try:
+                with open(source_path, "rb") as src, open(dest_path, "wb") as dst:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError as e:
+                if e.errno in _NO_CLONE_ERRNOS:
+                    # Filesystem (or device pair) can't clone: don't try again
+                    _NO_CLONE_DEVICES.add(devices)
+            else:
+                shutil.copystat(source_path, dest_path)
+                return
+    shutil.copy2(source_path, dest_path)
+
+
+def _load_metadata_dict(original_path: Path) -> Optional[Dict[str, Any]]:
+    """Load a file's .ruga metadata as a JSON-serializable dict, or None."""
+    metadata = load_ruga_metadata(original_path)
+    if metadata:
+        return metadata.model_dump(mode='json')
+    return None
+
+
+def _copy_with_sidecar(source_path: Path, dest_path: Path) -> bool:
+    """
+    Copy a file and, if present, its .ruga file next to the destination.
+    
+    Returns:
+        True if a .ruga file was copied as well
+    """
+    _fast_copy(source_path, dest_path)
+    
+    ruga_source = source_path.with_suffix(source_path.suffix + ".ruga")
+    ruga_dest = dest_path.with_suffix(dest_path.suffix + ".ruga")
+    try:
+        _fast_copy(ruga_source, ruga_dest)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _compact_file_record(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce one file's metadata to the record sent to the LLM.
+    
+    Keys are short but readable; empty fields are left out to save tokens.
+    
+    Args:
+        item: Dict with 'relative_path' and 'metadata' (from collect_ruga_metadata)
+        
+    Returns:
+        Compact record for the prompt's JSON file list
+    """
+    meta: Dict[str, Any] = item['metadata']
+    record: Dict[str, Any] = {"path": item['relative_path'], "title": meta.get('title', '')}
+    fields = (
+        ("categories", meta.get('categories')),
+        ("topics", (meta.get('topics') or [])[:5]),
+        ("tags", (meta.get('tags') or [])[:5]),
+        ("summary", (meta.get('summary') or '')[:200]),
+        ("authors", [a.get('name', '') for a in meta.get('authors', [])]),
+        ("created", meta.get('creation_date')),
+        ("modified", meta.get('last_modified_date')),
+    )
+    for key, value in fields:
+        if value:
+            record[key] = value
+    return record
+
+
 class FolderOrganizationService:
     """Service for generating and applying folder structures."""
     
@@ -39,6 +182,7 @@ class FolderOrganizationService:
         # Initialize LLM with structured output
         self.llm = get_chat_llm(temperature=0)
         self.structured_llm = self.llm.with_structured_output(FolderStructure)
+        self.structure_chain = FOLDER_STRUCTURE_PROMPT | self.structured_llm
         
         # Vector store service reference
         self.vector_store_service = vector_store_service
@@ -49,20 +193,25 @@ class FolderOrganizationService:
         
         Returns list of dictionaries with file metadata.
         """
-        metadata_list = []
+        # Find all .ruga files (walks the tree, so off the event loop)
+        ruga_files = await asyncio.to_thread(find_all_ruga_files, root_path)
+        original_paths = [
+            original_path for original_path, _ in ruga_files if original_path is not None
+        ]
         
-        # Find all .ruga files
-        ruga_files = find_all_ruga_files(root_path)
+        # Load and parse the metadata files concurrently in worker threads
+        semaphore = asyncio.Semaphore(RUGA_LOAD_CONCURRENCY)
         
-        for original_path, ruga_path in ruga_files:
-            if original_path is None:
-                continue
-            
-            # Load metadata
-            metadata = load_ruga_metadata(original_path)
-            if metadata:
+        async def load(original_path: Path) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await asyncio.to_thread(_load_metadata_dict, original_path)
+        
+        metadata_dicts = await asyncio.gather(*(load(path) for path in original_paths))
+        
+        metadata_list = []
+        for original_path, metadata_dict in zip(original_paths, metadata_dicts):
+            if metadata_dict:
                 rel_path = str(original_path.relative_to(root_path))
-                metadata_dict = metadata.model_dump(mode='json')
                 metadata_list.append({
                     'relative_path': rel_path,
                     'metadata': metadata_dict,
@@ -85,83 +234,13 @@ class FolderOrganizationService:
         if not metadata_list:
             raise ValueError("No .ruga files found in the specified path. Files must be analyzed first.")
         
-        # Build prompt with all metadata
-        file_summaries = []
-        for item in metadata_list:
-            meta = item['metadata']
-            file_summaries.append({
-                'path': item['relative_path'],
-                'title': meta.get('title', ''),
-                'categories': meta.get('categories', []),
-                'topics': meta.get('topics', []),
-                'tags': meta.get('tags', []),
-                'summary': meta.get('summary', ''),
-                'authors': [a.get('name', '') for a in meta.get('authors', [])],
-                'creation_date': meta.get('creation_date'),
-                'last_modified_date': meta.get('last_modified_date'),
-            })
-        
-        # Build file information text
-        file_info_text = "Files and their metadata:\n"
-        file_info_text += "=" * 80 + "\n\n"
-        
-        for i, file_info in enumerate(file_summaries, 1):
-            file_info_text += f"{i}. {file_info['path']}\n"
-            file_info_text += f"   Title: {file_info['title']}\n"
-            if file_info['categories']:
-                file_info_text += f"   Categories: {', '.join(file_info['categories'])}\n"
-            if file_info['topics']:
-                file_info_text += f"   Topics: {', '.join(file_info['topics'][:5])}\n"
-            if file_info['tags']:
-                file_info_text += f"   Tags: {', '.join(file_info['tags'][:5])}\n"
-            if file_info['summary']:
-                file_info_text += f"   Summary: {file_info['summary'][:200]}...\n"
-            if file_info['authors']:
-                file_info_text += f"   Authors: {', '.join(file_info['authors'])}\n"
-            if file_info['creation_date']:
-                file_info_text += f"   Creation Date: {file_info['creation_date']}\n"
-            if file_info['last_modified_date']:
-                file_info_text += f"   Last Modified: {file_info['last_modified_date']}\n"
-            file_info_text += "\n"
-        
-        # Create prompt
-        system_prompt = """You are an expert at organizing academic documents and presentations for a medical department.
-
-Your task is to analyze file metadata and suggest an organized folder structure that:
-- Groups files by category (Education/Capita Selecta, Education/Course, Research Meeting, Seminar, Workshop, Miscellaneous)
-- Organizes by academic year when dates are available
-- Uses clear, descriptive folder names
-- You can decide to give a different name to the file based on the summary, suggested_filename, title, topics, tags, etc.
-- Avoids deep nesting (max 3-4 levels)
-- Keeps related files together
-- If duplicates are found, move the duplicate to the original file's folder with a suffix indicating the duplicate number.
-
-For each file, suggest where it should be moved based on:
-- Its categories (primary organization)
-- Creation or modification dates (for year-based organization)
-- Topics and tags (for subcategorization)
-
-Return a structured folder organization with:
-1. A root folder name (descriptive, e.g., "Organized_Documents")
-2. List of all folders to create
-3. List of file moves (source -> destination)
-4. Brief rationale for the organization"""
-
-        human_prompt = f"""Analyze the following files and their metadata, then suggest an organized folder structure.
-
-{file_info_text}
-
-Generate a folder structure that organizes these {len(file_summaries)} files logically by category and year."""
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", human_prompt),
-        ])
-        
-        chain = prompt | self.structured_llm
+        # Compact JSON file list: far fewer tokens than labelled prose
+        files_json = orjson.dumps(
+            [_compact_file_record(item) for item in metadata_list]
+        ).decode()
         
         # Generate structure
-        structure = chain.invoke({})
+        structure = self.structure_chain.invoke({"files_json": files_json, "file_count": len(metadata_list)})
         
         # Generate structure ID
         structure_id = str(uuid4())
@@ -204,7 +283,8 @@ Generate a folder structure that organizes these {len(file_summaries)} files log
                 except Exception as e:
                     errors.append(f"Error creating folder {folder_path}: {str(e)}")
         
-        # Copy files
+        # Check sources up front; only existing files are copied
+        moves = []
         for file_move in structure.file_moves:
             source_path = original_root / file_move.source_path
             dest_path = new_root / file_move.destination_path
@@ -212,34 +292,48 @@ Generate a folder structure that organizes these {len(file_summaries)} files log
             if not source_path.exists():
                 errors.append(f"Source file not found: {file_move.source_path}")
                 continue
-            
-            if not dry_run:
-                try:
-                    # Create destination directory if needed
-                    dest_path.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    # Copy file
-                    import shutil
-                    shutil.copy2(source_path, dest_path)
-                    
-                    # Also copy .ruga file if it exists
-                    ruga_source = source_path.with_suffix(source_path.suffix + ".ruga")
-                    if ruga_source.exists():
-                        ruga_dest = dest_path.with_suffix(dest_path.suffix + ".ruga")
-                        shutil.copy2(ruga_source, ruga_dest)
+            moves.append((file_move, source_path, dest_path))
+        
+        if dry_run:
+            # Dry run - just count
+            return str(new_root.absolute()), len(moves), folders_created, errors
+        
+        # Create each destination directory once instead of once per file
+        for parent in {dest_path.parent for _, _, dest_path in moves}:
+            try:
+                parent.mkdir(parents=True, exist_ok=True)
+            except OSError:
+                # Reported by the copies that need this directory
+                pass
+        
+        # Copy files in parallel (the copy syscalls release the GIL)
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=COPY_WORKERS, thread_name_prefix="copy") as executor:
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, _copy_with_sidecar, source_path, dest_path)
+                    for _, source_path, dest_path in moves
+                ),
+                return_exceptions=True,
+            )
+        
+        # Re-index moved files with batched vector store writes
+        bulk = self.vector_store_service.bulk_ingest() if self.vector_store_service else nullcontext()
+        try:
+            with bulk:
+                for (file_move, source_path, dest_path), result in zip(moves, results):
+                    if isinstance(result, Exception):
+                        errors.append(f"Error copying {file_move.source_path}: {str(result)}")
+                        continue
                     
                     # Update vector store with new path
                     if self.vector_store_service:
                         try:
-                            # Load .ruga metadata if available for the new file
+                            # Load .ruga metadata if it was copied along with the file
                             ruga_metadata = None
-                            ruga_dest = dest_path.with_suffix(dest_path.suffix + ".ruga")
-                            if ruga_dest.exists():
+                            if result:
                                 try:
-                                    from ruga_file_handler import load_ruga_metadata
-                                    ruga_metadata = load_ruga_metadata(dest_path)
-                                    if ruga_metadata:
-                                        ruga_metadata = ruga_metadata.model_dump(mode='json')
+                                    ruga_metadata = _load_metadata_dict(dest_path)
                                 except Exception:
                                     pass
                             
@@ -252,15 +346,16 @@ Generate a folder structure that organizes these {len(file_summaries)} files log
                                 new_root_path=new_root,
                                 metadata=ruga_metadata,
                             )
+                        except VectorStoreWriteError as e:
+                            # A batch covering several files failed, not just this one
+                            errors.append(f"Warning: Could not write batched vector store updates: {str(e)}")
                         except Exception as e:
                             # Don't fail the whole operation if vector store update fails
                             errors.append(f"Warning: Could not update vector store for {file_move.source_path}: {str(e)}")
                     
                     files_copied += 1
-                except Exception as e:
-                    errors.append(f"Error copying {file_move.source_path}: {str(e)}")
-            else:
-                # Dry run - just count
-                files_copied += 1
+        except VectorStoreWriteError as e:
+            # The final batch is written when the block exits
+            errors.append(f"Warning: Could not write batched vector store updates: {str(e)}")
         
         return str(new_root.absolute()), files_copied, folders_created, errors
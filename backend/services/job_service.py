@@ -3,7 +3,8 @@ Service for managing analysis jobs.
 """
 
 from pathlib import Path
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
+from collections import Counter
 from uuid import UUID, uuid4
 from datetime import datetime
 import asyncio
@@ -28,6 +29,10 @@ class JobService:
         self.job_files: Dict[str, List[str]] = {}
         # Track job file status: job_id -> file_path -> status
         self.job_file_status: Dict[str, Dict[str, AnalysisStatus]] = {}
+        # Number of files per status: job_id -> Counter(status -> count)
+        self.job_status_counts: Dict[str, Counter] = {}
+        # Set once a job reaches a final status: job_id -> Event
+        self.job_events: Dict[str, asyncio.Event] = {}
         # Lock for thread safety
         self.lock = asyncio.Lock()
     
@@ -69,6 +74,10 @@ class JobService:
         self.job_file_status[job_id] = {
             path: AnalysisStatus.PENDING for path in file_paths
         }
+        self.job_status_counts[job_id] = Counter(
+            {AnalysisStatus.PENDING: len(self.job_file_status[job_id])}
+        )
+        self.job_events[job_id] = asyncio.Event()
         
         return job_id
     
@@ -80,46 +89,88 @@ class JobService:
         error_message: Optional[str] = None,
     ):
         """Update the status of a file within a job."""
+        await self.update_job_file_statuses(job_id, [(file_path, status, error_message)])
+    
+    async def update_job_file_statuses(
+        self,
+        job_id: str,
+        updates: List[Tuple[str, AnalysisStatus, Optional[str]]],
+    ):
+        """
+        Update the status of several files within a job at once.
+        
+        The lock is taken once for the whole batch, and the overall job status
+        is derived from per-status counters instead of scanning every file.
+        
+        Args:
+            job_id: Job ID
+            updates: List of (file_path, status, error_message) tuples
+        """
         async with self.lock:
             if job_id not in self.jobs:
                 return
             
-            # Get previous status to avoid double-counting
-            previous_status = self.job_file_status.get(job_id, {}).get(file_path)
-            
-            # Update file status
             if job_id not in self.job_file_status:
                 self.job_file_status[job_id] = {}
-            self.job_file_status[job_id][file_path] = status
-            
-            # Update job statistics (only if status changed to a final state)
+            file_status = self.job_file_status[job_id]
+            counts = self.job_status_counts.setdefault(job_id, Counter())
             job = self.jobs[job_id]
-            if status == AnalysisStatus.ANALYZED and previous_status != AnalysisStatus.ANALYZED:
-                job.files_processed += 1
-            elif status == AnalysisStatus.ERROR and previous_status != AnalysisStatus.ERROR:
-                job.files_failed += 1
+            
+            for file_path, status, error_message in updates:
+                # Get previous status to avoid double-counting
+                previous_status = file_status.get(file_path)
+                
+                # Update file status and the per-status counters
+                file_status[file_path] = status
+                if previous_status is not None:
+                    counts[previous_status] -= 1
+                counts[status] += 1
+                
+                # Update job statistics (only if status changed to a final state)
+                if status == AnalysisStatus.ANALYZED and previous_status != AnalysisStatus.ANALYZED:
+                    job.files_processed += 1
+                elif status == AnalysisStatus.ERROR and previous_status != AnalysisStatus.ERROR:
+                    job.files_failed += 1
+                
+                if error_message:
+                    job.error_message = error_message
             
             # Update overall job status
-            file_statuses = list(self.job_file_status[job_id].values())
-            if all(s == AnalysisStatus.ANALYZED for s in file_statuses):
+            total = len(file_status)
+            if counts[AnalysisStatus.ANALYZED] == total:
                 job.status = AnalysisStatus.ANALYZED
-            elif any(s == AnalysisStatus.IN_PROCESS for s in file_statuses):
+            elif counts[AnalysisStatus.IN_PROCESS]:
                 job.status = AnalysisStatus.IN_PROCESS
-            elif any(s == AnalysisStatus.ERROR for s in file_statuses):
-                if all(s in (AnalysisStatus.ANALYZED, AnalysisStatus.ERROR) for s in file_statuses):
+            elif counts[AnalysisStatus.ERROR]:
+                if counts[AnalysisStatus.ANALYZED] + counts[AnalysisStatus.ERROR] == total:
                     job.status = AnalysisStatus.ERROR
                 else:
                     job.status = AnalysisStatus.IN_PROCESS
             else:
                 job.status = AnalysisStatus.PENDING
             
-            if error_message:
-                job.error_message = error_message
+            # Wake up waiters once the job is finished
+            if job.status in (AnalysisStatus.ANALYZED, AnalysisStatus.ERROR):
+                self.job_events[job_id].set()
+    
+    async def wait_for_job(self, job_id: str) -> Optional[JobInfo]:
+        """
+        Wait until a job reaches a final status (analyzed or error).
+        
+        Returns the job, or None if it does not exist. Combine with
+        asyncio.wait_for to bound the wait.
+        """
+        event = self.job_events.get(job_id)
+        if event is None:
+            return None
+        await event.wait()
+        return self.jobs.get(job_id)
     
     async def get_job(self, job_id: str) -> Optional[JobInfo]:
         """Get job information by ID."""
-        async with self.lock:
-            return self.jobs.get(job_id)
+        # Reads take no lock: updates run on the event loop without awaiting
+        # mid-way, so a reader never sees a half-applied update
+        return self.jobs.get(job_id)
     
     async def list_jobs(self, include_file_statuses: bool = False) -> List[JobInfo]:
         """
@@ -128,15 +179,13 @@ class JobService:
         Args:
             include_file_statuses: If True, include individual file statuses for each job
         """
-        async with self.lock:
-            jobs = list(self.jobs.values())
-            if include_file_statuses:
-                # Add file statuses to each job
-                for job in jobs:
-                    job.file_statuses = self.job_file_status.get(job.job_id, {}).copy()
-            return jobs
+        jobs = list(self.jobs.values())
+        if include_file_statuses:
+            # Add file statuses to each job
+            for job in jobs:
+                job.file_statuses = self.job_file_status.get(job.job_id, {}).copy()
+        return jobs
     
     async def get_job_files_status(self, job_id: str) -> Dict[str, AnalysisStatus]:
         """Get status of all files in a job."""
-        async with self.lock:
-            return self.job_file_status.get(job_id, {}).copy()
+        return self.job_file_status.get(job_id, {}).copy()
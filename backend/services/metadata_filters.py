@@ -0,0 +1,87 @@
+"""
+Helpers for the chunk metadata written from .ruga files and the list-field filters.
+
+Kept free of Chroma and Docling imports, so they can be used and tested
+without the vector store's dependencies.
+"""
+
+from typing import Any, Dict, List
+import hashlib
+import json
+
+import numpy as np
+
+
+# .ruga list fields indexed for filtering
+LIST_FIELDS = ("categories", "topics", "tags")
+
+
+def metadata_fingerprint(metadata: Dict[str, Any]) -> str:
+    """Hash of the .ruga fields copied into chunk metadata (changes when a file is re-analyzed)."""
+    indexed = {
+        field: metadata.get(field)
+        for field in ("title", "categories", "topics", "tags", "file_id", "summary")
+    }
+    return hashlib.sha256(json.dumps(indexed, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def indexed_fields(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Chunk metadata fields taken from .ruga metadata.
+    
+    The summary is not included: it is stored on the first chunk only.
+    """
+    fields: Dict[str, Any] = {}
+    if "title" in metadata:
+        fields["title"] = metadata["title"]
+    for field in LIST_FIELDS:
+        if field in metadata:
+            fields[field] = join_list_field(metadata[field])
+            # Lowercased copy for the case-insensitive filter scans
+            fields[f"{field}_lc"] = fields[field].lower()
+    if "file_id" in metadata:
+        fields["file_id"] = str(metadata["file_id"])
+    if metadata.get("content_hash"):
+        fields["content_hash"] = metadata["content_hash"]
+    fields["metadata_hash"] = metadata_fingerprint(metadata)
+    return fields
+
+
+def join_list_field(values: Any) -> str:
+    """Store a list field as a delimited string, e.g. "|Research Meeting|Teaching|"."""
+    if isinstance(values, str):
+        values = [values]
+    return "|" + "|".join(str(value) for value in values or []) + "|"
+
+
+def list_field_matches(stored: str, needle: str) -> bool:
+    """
+    Check whether a stored list field matches needle (both already lowercased).
+    
+    A value matches when either string contains the other. Rows indexed
+    before the delimited format ("['a', 'b']") get a plain substring check.
+    """
+    if not stored.startswith("|"):
+        return needle in stored
+    return any(needle in value or value in needle for value in stored.strip("|").split("|") if value)
+
+
+def cosine_topk(query_embedding: List[float], doc_embeddings: List[Any], k: int) -> np.ndarray:
+    """
+    Return the indices of the k document embeddings most similar to the query, best first.
+    
+    Rows are normalized here as well: vectors written through CachedEmbeddings
+    are unit length, but rows indexed before that are not.
+    """
+    query_vec = np.asarray(query_embedding, dtype=np.float32)
+    query_vec = query_vec / (np.linalg.norm(query_vec) + 1e-12)
+    doc_matrix = np.asarray(doc_embeddings, dtype=np.float32).reshape(-1, query_vec.shape[0])
+    doc_norms = np.linalg.norm(doc_matrix, axis=1) + 1e-12
+    similarities = (doc_matrix @ query_vec) / doc_norms
+    
+    # Select the top k in O(N), then sort only those
+    if k < len(similarities):
+        top = np.argpartition(-similarities, k)[:k]
+    else:
+        top = np.arange(len(similarities))
+    return top[np.argsort(-similarities[top])]
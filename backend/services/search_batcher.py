@@ -0,0 +1,71 @@
+"""
+Micro-batching for similarity searches issued by concurrent tool calls.
+
+When the agent runs several retrieval tool calls in parallel, each one runs
+in its own thread. Instead of one embedding call and one Chroma query per
+call, searches arriving while another search is in flight are combined into
+a single batch_similarity_search. A search with nothing else in flight runs
+immediately, so a lone tool call never waits.
+"""
+
+from concurrent.futures import Future
+from typing import Callable, List
+import threading
+
+from langchain_core.documents import Document
+
+
+class SearchBatcher:
+    """Runs searches immediately when idle and batches those queued up behind a running one."""
+    
+    def __init__(self, search_many: Callable[[List[str]], List[List[Document]]]):
+        """
+        Initialize the batcher.
+        
+        Args:
+            search_many: Function searching a list of queries in one call
+        """
+        self.search_many = search_many
+        # Searches waiting for the next batch: (query, future for its results)
+        self._pending: List[tuple[str, Future]] = []
+        # Whether some caller is currently running batches
+        self._running = False
+        self._lock = threading.Lock()
+    
+    def search(self, query: str) -> List[Document]:
+        """
+        Search for query, batched with other searches queued meanwhile.
+        
+        If no search is running, the caller runs its own query right away and
+        then keeps running the searches that queued up in the meantime (as
+        one batch per round) until the queue is empty. Otherwise the query is
+        queued and the caller waits for its results.
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._running:
+                self._pending.append((query, future))
+                batch = None
+            else:
+                self._running = True
+                batch = [(query, future)]
+        
+        while batch:
+            self._run_batch(batch)
+            with self._lock:
+                batch, self._pending = self._pending, []
+                if not batch:
+                    self._running = False
+        
+        return future.result()
+    
+    def _run_batch(self, batch: List[tuple[str, Future]]):
+        """Run one batch and hand each caller its own results (or the error)."""
+        try:
+            results = self.search_many([query for query, _ in batch])
+        except Exception as e:
+            for _, waiting in batch:
+                waiting.set_exception(e)
+        else:
+            for (_, waiting), documents in zip(batch, results):
+                waiting.set_result(documents)
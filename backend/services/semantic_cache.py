@@ -0,0 +1,113 @@
+"""
+Semantic cache for chat retrieval tool results.
+
+Agent tool calls often repeat the same search with slightly different
+wording. Results are cached per filter (tool name and filter value) and a
+new query reuses a cached result when its embedding is close enough to a
+cached query, skipping the vector store round trip.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+import threading
+import time
+
+import numpy as np
+
+
+class SemanticQueryCache:
+    """Thread-safe LRU of tool results, matched by query embedding similarity."""
+    
+    def __init__(
+        self,
+        embed_query: Callable[[str], List[float]],
+        threshold: float = 0.95,
+        ttl: float = 300.0,
+        max_entries: int = 256,
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            embed_query: Function embedding a query (the vector store's embedder)
+            threshold: Minimum cosine similarity for a cached query to match
+            ttl: Seconds a cached result stays valid
+            max_entries: Maximum number of cached results
+        """
+        self.embed_query = embed_query
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (filter key, query) -> (normalized query vector or None, expires at, result)
+        self._entries: OrderedDict[
+            tuple[str, str], tuple[Optional[np.ndarray], float, Any]
+        ] = OrderedDict()
+        # Tools run in agent worker threads, writes come from the analysis workers
+        self._lock = threading.RLock()
+    
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        """Return the normalized embedding of query, or None for an empty query."""
+        if not query:
+            return None
+        vector = np.asarray(self.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def get(self, query: str, filter_key: str) -> Optional[Any]:
+        """
+        Return a cached result for this query and filter, or None on a miss.
+        
+        An exact query match is tried first; otherwise the most similar cached
+        query with the same filter key is used if it reaches the threshold.
+        """
+        query = query.strip()
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get((filter_key, query))
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end((filter_key, query))
+                return entry[2]
+            has_candidates = any(
+                key[0] == filter_key and entry[0] is not None
+                for key, entry in self._entries.items()
+            )
+        
+        if not query or not has_candidates:
+            return None
+        
+        vector = self._embed(query)
+        
+        with self._lock:
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if key[0] == filter_key and entry[0] is not None and entry[1] > now
+            ]
+            if not candidates:
+                return None
+            
+            # Cosine similarity against all cached queries for this filter at once
+            similarities = np.stack([entry[0] for _, entry in candidates]) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            
+            key, entry = candidates[best]
+            self._entries.move_to_end(key)
+            return entry[2]
+    
+    def put(self, query: str, filter_key: str, result: Any):
+        """Cache a result for this query and filter."""
+        query = query.strip()
+        vector = self._embed(query)
+        
+        with self._lock:
+            self._entries[(filter_key, query)] = (vector, time.monotonic() + self.ttl, result)
+            self._entries.move_to_end((filter_key, query))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached results (called when the vector store changes)."""
+        with self._lock:
+            self._entries.clear()
@@ -2,19 +2,31 @@
 Service for managing ChromaDB vector store for document embeddings.
 """
 
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import Callable, Iterator, List, Optional, Dict, Any
+import hashlib
+import os
 import sys
+import threading
+import uuid
 
 # Add project root to path
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
+# Import from examples
+EXAMPLES_DIR = PROJECT_ROOT / "examples"
+if str(EXAMPLES_DIR) not in sys.path:
+    sys.path.insert(0, str(EXAMPLES_DIR))
+
+from chromadb.config import Settings
 from langchain_chroma import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from docling.document_converter import DocumentConverter
+from ruga_file_handler import load_ruga_metadata
 
 # Add backend to path for imports
 BACKEND_DIR = Path(__file__).parent.parent
@@ -22,6 +34,22 @@ if str(BACKEND_DIR) not in sys.path:
     sys.path.insert(0, str(BACKEND_DIR))
 
 from utils.llm_config import get_embeddings
+from services.embedding_cache import CachedEmbeddings
+from services.metadata_filters import (
+    cosine_topk,
+    indexed_fields,
+    list_field_matches,
+    metadata_fingerprint,
+)
+
+
+
+class VectorStoreWriteError(Exception):
+    """A batched bulk_ingest write to Chroma failed; the buffered changes were not stored."""
+
+
+# Disk space for cached Docling markdown; least recently used files are evicted
+DOCLING_CACHE_MAX_BYTES = 512 * 1024 * 1024
 
 
 class VectorStoreService:
@@ -42,14 +70,20 @@ class VectorStoreService:
         self.persist_directory.mkdir(exist_ok=True)
         self.collection_name = collection_name
         
-        # Initialize embeddings (uses GreenPT if enabled, otherwise OpenAI)
-        self.embeddings = get_embeddings()
+        # Initialize embeddings (uses GreenPT if enabled, otherwise OpenAI),
+        # with repeated queries served from memory and chunk embeddings
+        # persisted next to the collection
+        self.embeddings = CachedEmbeddings(
+            get_embeddings(),
+            db_path=self.persist_directory / "embedding_cache.sqlite3",
+        )
         
-        # Initialize vector store
+        # Initialize vector store (telemetry off: no extra network call per write)
         self.vector_store = Chroma(
             collection_name=collection_name,
             embedding_function=self.embeddings,
             persist_directory=str(self.persist_directory),
+            client_settings=Settings(is_persistent=True, anonymized_telemetry=False),
         )
         
         # Initialize text splitter
@@ -59,16 +93,213 @@ class VectorStoreService:
             add_start_index=True,
         )
         
-        # Initialize Docling converter (lazy)
+        # Initialize Docling converter (lazy). add_document runs on the analysis
+        # worker threads, which take turns on it instead of each loading the models
         self._converter: Optional[DocumentConverter] = None
+        self._converter_lock = threading.Lock()
+        
+        # Docling markdown cached by file content hash
+        self._docling_cache_dir = self.persist_directory / "docling_cache"
+        self._docling_cache_dir.mkdir(exist_ok=True)
+        # Content hashes of recently converted files: (path, size, mtime_ns) -> digest
+        self._docling_digests: Dict[tuple[str, int, int], str] = {}
+        # Total size of the cached files (computed on the first write)
+        self._docling_cache_bytes: Optional[int] = None
+        self._docling_lock = threading.Lock()
+        
+        # Callbacks run after documents are added or deleted (e.g. cache invalidation)
+        self._change_listeners: List[Callable[[], None]] = []
+        
+        # Writes buffered by bulk_ingest, per thread (batch_size, chunks, ids,
+        # metadata updates by id, absolute paths of the buffered files)
+        self._bulk = threading.local()
+        
+        # Full documents/metadatas fetch for filter scans, dropped on every change;
+        # the version keeps a fetch that raced with a write from being cached
+        self._all_cache: Optional[Dict[str, Any]] = None
+        self._version = 0
+    
+    def add_change_listener(self, callback: Callable[[], None]):
+        """Register a callback to run whenever the indexed documents change."""
+        self._change_listeners.append(callback)
+    
+    def _notify_change(self):
+        """Drop cached collection data and run the registered change callbacks."""
+        self._version += 1
+        self._all_cache = None
+        for callback in self._change_listeners:
+            callback()
+    
+    @contextmanager
+    def bulk_ingest(self, batch_size: int = 200) -> Iterator[None]:
+        """
+        Buffer add_document and update_document_path writes and send them to Chroma in batches.
+        
+        Inside the block, add_document assigns chunk IDs up front and path
+        updates are queued; both are written every batch_size rows and when
+        the block exits, instead of one Chroma transaction per file.
+        
+        Args:
+            batch_size: Number of rows per Chroma write
+            
+        Raises:
+            VectorStoreWriteError: If writing a batch fails
+        """
+        self._bulk.batch_size = batch_size
+        self._bulk.chunks = []
+        self._bulk.ids = []
+        self._bulk.updates = {}
+        self._bulk.paths = set()
+        try:
+            yield
+        finally:
+            try:
+                self._flush_pending()
+            finally:
+                self._bulk.chunks = None
+                self._bulk.ids = None
+                self._bulk.updates = None
+                self._bulk.paths = None
+    
+    def _bulk_active(self) -> bool:
+        """Whether the calling thread is inside bulk_ingest."""
+        return getattr(self._bulk, "chunks", None) is not None
+    
+    def _flush_if_buffered(self, file_path_str: str):
+        """Write buffered changes if they touch this file (so lookups see them)."""
+        if self._bulk_active() and file_path_str in self._bulk.paths:
+            self._flush_pending()
+    
+    def _flush_if_full(self):
+        """Write buffered changes once they reach the batch size."""
+        if len(self._bulk.chunks) + len(self._bulk.updates) >= self._bulk.batch_size:
+            self._flush_pending()
+    
+    def _flush_pending(self):
+        """
+        Write the changes buffered by bulk_ingest to Chroma.
+        
+        Raises:
+            VectorStoreWriteError: If a write fails (the buffer is dropped)
+        """
+        if not self._bulk_active():
+            return
+        
+        chunks, ids, updates = self._bulk.chunks, self._bulk.ids, self._bulk.updates
+        if not chunks and not updates:
+            return
+        
+        self._bulk.chunks = []
+        self._bulk.ids = []
+        self._bulk.updates = {}
+        self._bulk.paths = set()
+        try:
+            if chunks:
+                self.vector_store.add_documents(documents=chunks, ids=ids)
+            if updates:
+                self.vector_store._collection.update(
+                    ids=list(updates),
+                    metadatas=list(updates.values()),
+                )
+        except Exception as e:
+            raise VectorStoreWriteError(
+                f"could not write {len(chunks)} chunks and {len(updates)} updates: {e}"
+            ) from e
+        finally:
+            self._notify_change()
     
     @property
     def converter(self) -> DocumentConverter:
         """Lazy initialization of Docling converter."""
-        if self._converter is None:
-            self._converter = DocumentConverter()
+        with self._converter_lock:
+            if self._converter is None:
+                self._converter = DocumentConverter()
         return self._converter
     
+    def _docling_digest(self, file_path: Path) -> str:
+        """Content hash of a file, reused while its size and mtime are unchanged."""
+        stat = file_path.stat()
+        stat_key = (str(file_path.absolute()), stat.st_size, stat.st_mtime_ns)
+        digest = self._docling_digests.get(stat_key)
+        if digest is None:
+            with file_path.open("rb") as f:
+                digest = hashlib.file_digest(f, "sha256").hexdigest()
+            with self._docling_lock:
+                if len(self._docling_digests) >= 10000:
+                    self._docling_digests.clear()
+                self._docling_digests[stat_key] = digest
+        return digest
+    
+    def _convert_with_docling(self, file_path: Path) -> str:
+        """
+        Convert a file to markdown with Docling, cached on disk by content hash.
+        
+        Re-indexing the same file (also after a move or rename) reads the
+        cached markdown instead of parsing the document again.
+        """
+        digest = self._docling_digest(file_path)
+        cache_path = self._docling_cache_dir / f"{digest}.md"
+        
+        try:
+            content = cache_path.read_text(encoding="utf-8")
+            # Mark as recently used for eviction
+            os.utime(cache_path)
+            return content
+        except FileNotFoundError:
+            pass
+        
+        converter = self.converter
+        with self._converter_lock:
+            result = converter.convert(str(file_path))
+        content = result.document.export_to_markdown()
+        
+        # Write atomically so a concurrent reader never sees a partial file
+        data = content.encode("utf-8")
+        tmp_path = cache_path.with_name(f"{digest}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, cache_path)
+        
+        with self._docling_lock:
+            if self._docling_cache_bytes is None:
+                self._docling_cache_bytes = sum(size for _, size, _ in self._docling_cache_entries())
+            else:
+                self._docling_cache_bytes += len(data)
+            if self._docling_cache_bytes > DOCLING_CACHE_MAX_BYTES:
+                self._evict_docling_cache()
+        return content
+    
+    def _docling_cache_entries(self) -> List[tuple[float, int, str]]:
+        """List cached markdown files as (mtime, size, path), skipping files removed meanwhile."""
+        entries = []
+        for entry in os.scandir(self._docling_cache_dir):
+            if entry.name.endswith(".md"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+    
+    def _evict_docling_cache(self):
+        """
+        Delete the least recently used cached markdown files beyond DOCLING_CACHE_MAX_BYTES.
+        
+        Only runs once the running size exceeds the limit; the caller holds the lock.
+        """
+        entries = self._docling_cache_entries()
+        total = sum(size for _, size, _ in entries)
+        
+        for _, size, path in sorted(entries):
+            if total <= DOCLING_CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        
+        self._docling_cache_bytes = total
+    
     def get_file_content(self, file_path: Path) -> str:
         """
         Extract content from a file using Docling if supported, otherwise read directly.
@@ -87,8 +318,7 @@ class VectorStoreService:
         elif file_ext in ['.pdf', '.docx', '.doc']:
             # Use Docling for supported formats
             try:
-                result = self.converter.convert(str(file_path))
-                return result.document.export_to_markdown()
+                return self._convert_with_docling(file_path)
             except Exception as e:
                 print(f"⚠️  Error processing {file_path.name} with Docling: {e}")
                 # Fallback: try to read as text
@@ -99,8 +329,7 @@ class VectorStoreService:
         else:
             # For other formats, try Docling first, then fallback to text reading
             try:
-                result = self.converter.convert(str(file_path))
-                return result.document.export_to_markdown()
+                return self._convert_with_docling(file_path)
             except Exception:
                 # Fallback to reading as text
                 try:
@@ -113,6 +342,7 @@ class VectorStoreService:
         file_path: Path,
         root_path: Path,
         metadata: Optional[Dict[str, Any]] = None,
+        content: Optional[str] = None,
     ) -> List[str]:
         """
         Add a document to the vector store.
@@ -121,13 +351,37 @@ class VectorStoreService:
             file_path: Full path to the file
             root_path: Root directory path (for relative paths)
             metadata: Additional metadata to include (e.g., from .ruga file)
+            content: Already extracted content (extracted here if not given)
             
         Returns:
             List of document IDs added to the vector store
         """
         try:
+            # Skip files whose current content and metadata are already indexed
+            # at this path
+            content_hash = metadata.get("content_hash") if metadata else None
+            metadata_hash = metadata_fingerprint(metadata) if metadata else None
+            if content_hash:
+                self._flush_if_buffered(str(file_path.absolute()))
+                existing = self.vector_store._collection.get(
+                    where={"$and": [
+                        {"file_path": {"$eq": str(file_path.absolute())}},
+                        {"content_hash": {"$eq": content_hash}},
+                    ]},
+                    include=["metadatas"],
+                )
+                if existing and existing.get("ids"):
+                    if existing["metadatas"][0].get("metadata_hash") == metadata_hash:
+                        print(f"  ✓ {file_path.name} already indexed, skipping vector store")
+                        return existing["ids"]
+                    # Same content, new analysis: re-index with the new metadata
+                    # (chunk embeddings come from the embedding cache)
+                    self.vector_store._collection.delete(ids=existing["ids"])
+                    self._notify_change()
+            
             # Extract content
-            content = self.get_file_content(file_path)
+            if content is None:
+                content = self.get_file_content(file_path)
             
             if not content or len(content.strip()) < 10:
                 print(f"⚠️  File {file_path.name} appears empty, skipping vector store")
@@ -144,19 +398,7 @@ class VectorStoreService:
             
             # Add additional metadata if provided
             if metadata:
-                # Add relevant fields from metadata
-                if "title" in metadata:
-                    doc_metadata["title"] = metadata["title"]
-                if "categories" in metadata:
-                    doc_metadata["categories"] = str(metadata["categories"])
-                if "topics" in metadata:
-                    doc_metadata["topics"] = str(metadata["topics"])
-                if "tags" in metadata:
-                    doc_metadata["tags"] = str(metadata["tags"])
-                if "summary" in metadata:
-                    doc_metadata["summary"] = metadata["summary"]
-                if "file_id" in metadata:
-                    doc_metadata["file_id"] = str(metadata["file_id"])
+                doc_metadata.update(indexed_fields(metadata))
             
             # Create document
             doc = Document(
@@ -167,12 +409,28 @@ class VectorStoreService:
             # Split into chunks
             chunks = self.text_splitter.split_documents([doc])
             
-            # Add to vector store
-            document_ids = self.vector_store.add_documents(documents=chunks)
+            # Keep the (large) summary on the first chunk only instead of
+            # duplicating it on every chunk row
+            if chunks and metadata and "summary" in metadata:
+                chunks[0].metadata["summary"] = metadata["summary"]
+            
+            # Add to vector store (buffered inside bulk_ingest)
+            if self._bulk_active():
+                document_ids = [str(uuid.uuid4()) for _ in chunks]
+                self._bulk.chunks.extend(chunks)
+                self._bulk.ids.extend(document_ids)
+                self._bulk.paths.add(doc_metadata["file_path"])
+                self._flush_if_full()
+            else:
+                document_ids = self.vector_store.add_documents(documents=chunks)
+                self._notify_change()
             
             print(f"  ✓ Added {len(document_ids)} chunks to vector store for {file_path.name}")
             return document_ids
             
+        except VectorStoreWriteError:
+            # A batch with other files' chunks failed: the caller must know
+            raise
         except Exception as e:
             print(f"  ❌ Error adding {file_path.name} to vector store: {e}")
             return []
@@ -184,13 +442,15 @@ class VectorStoreService:
         old_root_path: Path,
         new_root_path: Optional[Path] = None,
         metadata: Optional[Dict[str, Any]] = None,
+        content: Optional[str] = None,
     ) -> bool:
         """
         Update the file path metadata for a document in the vector store.
         
-        This is used when files are moved during organization.
-        Since ChromaDB doesn't support direct updates, we delete the old document
-        and re-add it with the new path.
+        This is used when files are moved during organization. The path
+        fields of the existing chunks (and the .ruga fields, when metadata is
+        given) are rewritten in place, keeping their vectors; the document is
+        only deleted and re-added when its content hash changed.
         
         Args:
             old_path: Original file path (absolute)
@@ -198,6 +458,7 @@ class VectorStoreService:
             old_root_path: Original root directory path (for relative paths)
             new_root_path: New root directory path (for relative paths). If None, uses old_root_path
             metadata: Optional metadata to include (e.g., from .ruga file)
+            content: Already extracted content, used if the document is re-indexed
             
         Returns:
             True if update was successful, False otherwise
@@ -207,42 +468,102 @@ class VectorStoreService:
                 new_root_path = old_root_path
             
             old_rel_path = str(old_path.relative_to(old_root_path))
+            new_rel_path = str(new_path.relative_to(new_root_path))
+            
+            # Buffered changes may belong to this file
+            self._flush_if_buffered(str(old_path.absolute()))
             
-            # Delete old document
-            deleted = self.delete_document(old_path, old_root_path)
+            collection = self.vector_store._collection
+            existing = collection.get(
+                where={"file_path": {"$eq": str(old_path.absolute())}},
+                include=["metadatas"],
+            )
             
-            if not deleted:
+            if not existing or not existing.get("ids"):
                 print(f"  ⚠️  No documents found to update for: {old_rel_path}")
                 return False
             
-            # Re-add document with new path
             # Load .ruga metadata if available
             if metadata is None:
                 ruga_path = new_path.with_suffix(new_path.suffix + ".ruga")
                 if ruga_path.exists():
                     try:
-                        from ruga_file_handler import load_ruga_metadata
                         ruga_metadata = load_ruga_metadata(new_path)
                         if ruga_metadata:
                             metadata = ruga_metadata.model_dump(mode='json')
                     except Exception:
                         pass
             
-            # Add document with new path
+            # Unchanged content: rewrite the path (and metadata) fields, keep the vectors
+            new_hash = metadata.get("content_hash") if metadata else None
+            old_hash = existing["metadatas"][0].get("content_hash")
+            if not new_hash or not old_hash or new_hash == old_hash:
+                path_fields = {
+                    "source": new_rel_path,
+                    "file_path": str(new_path.absolute()),
+                    "file_name": new_path.name,
+                    "file_type": new_path.suffix.lower(),
+                }
+                ruga_fields = indexed_fields(metadata) if metadata else {}
+                new_metadatas = []
+                for chunk_metadata in existing["metadatas"]:
+                    new_metadata = {**chunk_metadata, **path_fields}
+                    if metadata:
+                        new_metadata.update(ruga_fields)
+                        if "summary" in chunk_metadata and "summary" in metadata:
+                            new_metadata["summary"] = metadata["summary"]
+                    new_metadatas.append(new_metadata)
+                if self._bulk_active():
+                    self._bulk.updates.update(zip(existing["ids"], new_metadatas))
+                    self._bulk.paths.update((str(old_path.absolute()), path_fields["file_path"]))
+                    self._flush_if_full()
+                else:
+                    collection.update(ids=existing["ids"], metadatas=new_metadatas)
+                    self._notify_change()
+                print(f"  ✓ Moved document from {old_rel_path} to {new_rel_path}")
+                return True
+            
+            # Content changed: delete and re-index at the new path
+            self.delete_document(old_path, old_root_path)
             self.add_document(
                 file_path=new_path,
                 root_path=new_root_path,
                 metadata=metadata,
+                content=content,
             )
             
-            new_rel_path = str(new_path.relative_to(new_root_path))
             print(f"  ✓ Updated document from {old_rel_path} to {new_rel_path}")
             return True
             
+        except VectorStoreWriteError:
+            raise
         except Exception as e:
             print(f"  ❌ Error updating document path in vector store: {e}")
             return False
     
+    def find_paths_by_content_hash(self, content_hash: str) -> List[str]:
+        """
+        Return the absolute paths of indexed files with this content hash.
+        
+        Args:
+            content_hash: SHA-256 of the file bytes (as stored in .ruga metadata)
+            
+        Returns:
+            Distinct file paths, possibly empty
+        """
+        try:
+            results = self.vector_store._collection.get(
+                where={"content_hash": {"$eq": content_hash}},
+                include=["metadatas"],
+            )
+        except Exception as e:
+            print(f"  ⚠️  Error looking up content hash in vector store: {e}")
+            return []
+        
+        paths = {metadata.get("file_path") for metadata in results.get("metadatas") or []}
+        paths.discard(None)
+        return sorted(paths)
+    
     def delete_document(self, file_path: Path, root_path: Path) -> bool:
         """
         Delete a document from the vector store.
@@ -258,6 +579,9 @@ class VectorStoreService:
             rel_path = str(file_path.relative_to(root_path))
             file_path_str = str(file_path.absolute())
             
+            # Buffered changes may belong to this file
+            self._flush_if_buffered(file_path_str)
+            
             # Use the collection directly to query by metadata
             # ChromaDB where clause: {"metadata_field": {"$eq": "value"}}
             collection = self.vector_store._collection
@@ -287,10 +611,13 @@ class VectorStoreService:
             
             # Delete documents
             collection.delete(ids=results["ids"])
+            self._notify_change()
             
             print(f"  ✓ Deleted {len(results['ids'])} document chunks for {file_path.name}")
             return True
             
+        except VectorStoreWriteError:
+            raise
         except Exception as e:
             print(f"  ❌ Error deleting document from vector store: {e}")
             return False
@@ -302,157 +629,125 @@ class VectorStoreService:
         except Exception:
             return 0
     
-    def filter_by_category(self, category: str, query: Optional[str] = None, k: int = 5) -> List[Document]:
+    def batch_similarity_search(self, queries: List[str], k: int = 4) -> List[List[Document]]:
         """
-        Filter documents by category and optionally search within them.
+        Run several similarity searches with one embedding call and one query.
         
         Args:
-            category: Category to filter by
-            query: Optional search query to filter results
+            queries: Search queries
+            k: Number of results per query
+            
+        Returns:
+            List of documents for each query, in the order of queries
+        """
+        if not queries:
+            return []
+        
+        query_embeddings = self.embeddings.embed_queries(queries)
+        results = self.vector_store._collection.query(
+            query_embeddings=query_embeddings,
+            n_results=k,
+            include=["documents", "metadatas"],
+        )
+        
+        return [
+            [
+                Document(page_content=text, metadata=metadata or {})
+                for text, metadata in zip(documents, metadatas)
+            ]
+            for documents, metadatas in zip(results["documents"], results["metadatas"])
+        ]
+    
+    def _get_all(self) -> Dict[str, Any]:
+        """
+        Fetch the documents and metadatas of all chunks, cached until the store changes.
+        
+        Browsing by category, topic and tag back to back reuses one fetch
+        instead of pulling the whole collection on every call.
+        """
+        cached = self._all_cache
+        if cached is not None:
+            return cached
+        
+        version = self._version
+        # IDs are returned by default, so we don't need to include them
+        results = self.vector_store._collection.get(include=["documents", "metadatas"])
+        if version == self._version:
+            self._all_cache = results
+        return results
+    
+    def _get_embeddings(self, ids: List[str]) -> List[Any]:
+        """Fetch the embeddings of the given chunk IDs, in the same order."""
+        results = self.vector_store._collection.get(ids=ids, include=["embeddings"])
+        by_id = dict(zip(results["ids"], results["embeddings"]))
+        return [by_id[chunk_id] for chunk_id in ids]
+    
+    def _filter_by_list_field(self, field: str, value: str, query: Optional[str], k: int) -> List[Document]:
+        """
+        Filter documents by a list metadata field and optionally search within them.
+        
+        Args:
+            field: List field to filter on (categories, topics or tags)
+            value: Value to filter by
+            query: Optional search query to rank the filtered documents
             k: Number of results to return
             
         Returns:
             List of filtered documents
         """
         try:
-            collection = self.vector_store._collection
-            
-            # Get all documents - we'll filter in Python since categories are stored as string representations
-            # First, get all documents with embeddings
-            # IDs are returned by default, so we don't need to include them
-            all_results = collection.get(
-                include=["documents", "metadatas", "embeddings"],
-            )
-            
+            all_results = self._get_all()
             if not all_results or not all_results.get("ids"):
                 return []
             
-            # Filter by category in Python
-            # Categories are stored as string representations like "['Education/Capita Selecta', 'Research Meeting']"
-            filtered_ids = []
-            filtered_documents = []
-            filtered_metadatas = []
-            filtered_embeddings = []
+            # Values match by substring, which Chroma's where clause cannot
+            # express, so the cached collection is scanned instead.
+            # Lists are stored as delimited strings like "|Education/Capita Selecta|Research Meeting|"
+            matches = []
+            needle = value.lower()
             
             for i, metadata in enumerate(all_results.get("metadatas", [])):
-                categories_str = metadata.get("categories", "")
-                if categories_str:
-                    # Parse the string representation or check if category is in the string
-                    # Handle both list string format and simple string format
-                    import ast
-                    try:
-                        # Try to parse as Python literal (list string)
-                        categories_list = ast.literal_eval(categories_str)
-                        if isinstance(categories_list, list):
-                            if any(category.lower() in cat.lower() or cat.lower() in category.lower() 
-                                   for cat in categories_list):
-                                filtered_ids.append(all_results["ids"][i])
-                                filtered_documents.append(all_results["documents"][i])
-                                filtered_metadatas.append(metadata)
-                                embeddings_list = all_results.get("embeddings")
-                                if embeddings_list is not None and i < len(embeddings_list):
-                                    filtered_embeddings.append(embeddings_list[i])
-                        elif isinstance(categories_list, str):
-                            if category.lower() in categories_list.lower():
-                                filtered_ids.append(all_results["ids"][i])
-                                filtered_documents.append(all_results["documents"][i])
-                                filtered_metadatas.append(metadata)
-                                embeddings_list = all_results.get("embeddings")
-                                if embeddings_list is not None and i < len(embeddings_list):
-                                    filtered_embeddings.append(embeddings_list[i])
-                    except (ValueError, SyntaxError):
-                        # If parsing fails, do simple string contains check
-                        if category.lower() in categories_str.lower():
-                            filtered_ids.append(all_results["ids"][i])
-                            filtered_documents.append(all_results["documents"][i])
-                            filtered_metadatas.append(metadata)
-                            embeddings_list = all_results.get("embeddings")
-                            if embeddings_list is not None and i < len(embeddings_list):
-                                filtered_embeddings.append(embeddings_list[i])
-            
-            if not filtered_ids:
-                return []
+                # Rows indexed before the lowercased copy existed are lowered here
+                stored = metadata.get(f"{field}_lc") or metadata.get(field, "").lower()
+                if stored and list_field_matches(stored, needle):
+                    matches.append(i)
             
-            results = {
-                "ids": filtered_ids,
-                "documents": filtered_documents,
-                "metadatas": filtered_metadatas,
-                "embeddings": filtered_embeddings,
-            }
+            if not matches:
+                return []
             
-            # If query is provided, use similarity search on filtered results
+            # Rank the matches by cosine similarity (one matrix-vector product) if
+            # a query is given; embeddings are only fetched for the matches
             if query:
-                # Get embeddings for the query
+                embeddings = self._get_embeddings([all_results["ids"][i] for i in matches])
                 query_embedding = self.embeddings.embed_query(query)
-                
-                # Get embeddings for filtered documents
-                filtered_embeddings = results.get("embeddings", [])
-                filtered_ids = results["ids"]
-                filtered_metadatas = results.get("metadatas", [])
-                filtered_documents = results.get("documents", [])
-                
-                # Check if we have embeddings (check length, not truthiness to avoid numpy array issues)
-                if not filtered_embeddings or len(filtered_embeddings) == 0:
-                    # If no embeddings, just return filtered documents without similarity ranking
-                    docs = []
-                    for i, doc_text in enumerate(filtered_documents):
-                        doc = Document(
-                            page_content=doc_text,
-                            metadata=filtered_metadatas[i] if filtered_metadatas and i < len(filtered_metadatas) else {},
-                        )
-                        docs.append(doc)
-                    return docs[:k]
-                
-                # Compute similarities
-                import numpy as np
-                query_vec = np.array(query_embedding, dtype=np.float32)
-                doc_embeddings = np.array(filtered_embeddings, dtype=np.float32)
-                
-                # Ensure doc_embeddings is 2D
-                if doc_embeddings.ndim == 1:
-                    doc_embeddings = doc_embeddings.reshape(1, -1)
-                
-                # Compute cosine similarities
-                # Normalize vectors
-                query_norm = np.linalg.norm(query_vec)
-                doc_norms = np.linalg.norm(doc_embeddings, axis=1)
-                
-                # Avoid division by zero
-                doc_norms = np.where(doc_norms == 0, 1, doc_norms)
-                query_norm = query_norm if query_norm != 0 else 1
-                
-                # Compute dot products and normalize
-                similarities = np.dot(doc_embeddings, query_vec) / (doc_norms * query_norm)
-                
-                # Get top k
-                top_indices = np.argsort(similarities)[::-1][:k]
-                
-                # Build documents
-                docs = []
-                for idx in top_indices:
-                    doc = Document(
-                        page_content=filtered_documents[idx],
-                        metadata=filtered_metadatas[idx] if filtered_metadatas and idx < len(filtered_metadatas) else {},
-                    )
-                    docs.append(doc)
-                
-                return docs
-            else:
-                # Return filtered documents without search
-                docs = []
-                for i, doc_text in enumerate(results.get("documents", [])):
-                    doc = Document(
-                        page_content=doc_text,
-                        metadata=results.get("metadatas", [{}])[i] if results.get("metadatas") else {},
-                    )
-                    docs.append(doc)
-                
-                return docs[:k]
-                
+                matches = [matches[idx] for idx in cosine_topk(query_embedding, embeddings, k)]
+            
+            return [
+                Document(
+                    page_content=all_results["documents"][i],
+                    metadata=all_results["metadatas"][i] or {},
+                )
+                for i in matches[:k]
+            ]
+            
         except Exception as e:
-            print(f"  ❌ Error filtering by category: {e}")
+            print(f"  ❌ Error filtering by {field}: {e}")
             return []
     
+    def filter_by_category(self, category: str, query: Optional[str] = None, k: int = 5) -> List[Document]:
+        """
+        Filter documents by category and optionally search within them.
+        
+        Args:
+            category: Category to filter by
+            query: Optional search query to filter results
+            k: Number of results to return
+            
+        Returns:
+            List of filtered documents
+        """
+        return self._filter_by_list_field("categories", category, query, k)
+    
     def filter_by_topic(self, topic: str, query: Optional[str] = None, k: int = 5) -> List[Document]:
         """
         Filter documents by topic and optionally search within them.
@@ -465,127 +760,7 @@ class VectorStoreService:
         Returns:
             List of filtered documents
         """
-        try:
-            collection = self.vector_store._collection
-            
-            # Get all documents - we'll filter in Python since topics are stored as string representations
-            # IDs are returned by default, so we don't need to include them
-            all_results = collection.get(
-                include=["documents", "metadatas", "embeddings"],
-            )
-            
-            if not all_results or not all_results.get("ids"):
-                return []
-            
-            # Filter by topic in Python
-            filtered_ids = []
-            filtered_documents = []
-            filtered_metadatas = []
-            filtered_embeddings = []
-            
-            for i, metadata in enumerate(all_results.get("metadatas", [])):
-                topics_str = metadata.get("topics", "")
-                if topics_str:
-                    import ast
-                    try:
-                        topics_list = ast.literal_eval(topics_str)
-                        if isinstance(topics_list, list):
-                            if any(topic.lower() in t.lower() or t.lower() in topic.lower() 
-                                   for t in topics_list):
-                                filtered_ids.append(all_results["ids"][i])
-                                filtered_documents.append(all_results["documents"][i])
-                                filtered_metadatas.append(metadata)
-                                embeddings_list = all_results.get("embeddings")
-                                if embeddings_list is not None and i < len(embeddings_list):
-                                    filtered_embeddings.append(embeddings_list[i])
-                        elif isinstance(topics_list, str):
-                            if topic.lower() in topics_list.lower():
-                                filtered_ids.append(all_results["ids"][i])
-                                filtered_documents.append(all_results["documents"][i])
-                                filtered_metadatas.append(metadata)
-                                embeddings_list = all_results.get("embeddings")
-                                if embeddings_list is not None and i < len(embeddings_list):
-                                    filtered_embeddings.append(embeddings_list[i])
-                    except (ValueError, SyntaxError):
-                        if topic.lower() in topics_str.lower():
-                            filtered_ids.append(all_results["ids"][i])
-                            filtered_documents.append(all_results["documents"][i])
-                            filtered_metadatas.append(metadata)
-                            embeddings_list = all_results.get("embeddings")
-                            if embeddings_list is not None and i < len(embeddings_list):
-                                filtered_embeddings.append(embeddings_list[i])
-            
-            if not filtered_ids:
-                return []
-            
-            results = {
-                "ids": filtered_ids,
-                "documents": filtered_documents,
-                "metadatas": filtered_metadatas,
-                "embeddings": filtered_embeddings,
-            }
-            
-            # If query is provided, use similarity search on filtered results
-            if query:
-                query_embedding = self.embeddings.embed_query(query)
-                filtered_embeddings = results.get("embeddings", [])
-                filtered_documents = results.get("documents", [])
-                filtered_metadatas = results.get("metadatas", [])
-                
-                # Check if we have embeddings (check length, not truthiness to avoid numpy array issues)
-                if not filtered_embeddings or len(filtered_embeddings) == 0:
-                    # If no embeddings, just return filtered documents without similarity ranking
-                    docs = []
-                    for i, doc_text in enumerate(filtered_documents):
-                        doc = Document(
-                            page_content=doc_text,
-                            metadata=filtered_metadatas[i] if filtered_metadatas and i < len(filtered_metadatas) else {},
-                        )
-                        docs.append(doc)
-                    return docs[:k]
-                
-                import numpy as np
-                query_vec = np.array(query_embedding, dtype=np.float32)
-                doc_embeddings = np.array(filtered_embeddings, dtype=np.float32)
-                
-                # Ensure doc_embeddings is 2D
-                if doc_embeddings.ndim == 1:
-                    doc_embeddings = doc_embeddings.reshape(1, -1)
-                
-                # Compute cosine similarities with proper normalization
-                query_norm = np.linalg.norm(query_vec)
-                doc_norms = np.linalg.norm(doc_embeddings, axis=1)
-                
-                # Avoid division by zero
-                doc_norms = np.where(doc_norms == 0, 1, doc_norms)
-                query_norm = query_norm if query_norm != 0 else 1
-                
-                similarities = np.dot(doc_embeddings, query_vec) / (doc_norms * query_norm)
-                top_indices = np.argsort(similarities)[::-1][:k]
-                
-                docs = []
-                for idx in top_indices:
-                    doc = Document(
-                        page_content=filtered_documents[idx],
-                        metadata=filtered_metadatas[idx] if filtered_metadatas and idx < len(filtered_metadatas) else {},
-                    )
-                    docs.append(doc)
-                
-                return docs
-            else:
-                docs = []
-                for i, doc_text in enumerate(results.get("documents", [])):
-                    doc = Document(
-                        page_content=doc_text,
-                        metadata=results.get("metadatas", [{}])[i] if results.get("metadatas") else {},
-                    )
-                    docs.append(doc)
-                
-                return docs[:k]
-                
-        except Exception as e:
-            print(f"  ❌ Error filtering by topic: {e}")
-            return []
+        return self._filter_by_list_field("topics", topic, query, k)
     
     def filter_by_tag(self, tag: str, query: Optional[str] = None, k: int = 5) -> List[Document]:
         """
@@ -599,124 +774,4 @@ class VectorStoreService:
         Returns:
             List of filtered documents
         """
-        try:
-            collection = self.vector_store._collection
-            
-            # Get all documents - we'll filter in Python since tags are stored as string representations
-            # IDs are returned by default, so we don't need to include them
-            all_results = collection.get(
-                include=["documents", "metadatas", "embeddings"],
-            )
-            
-            if not all_results or not all_results.get("ids"):
-                return []
-            
-            # Filter by tag in Python
-            filtered_ids = []
-            filtered_documents = []
-            filtered_metadatas = []
-            filtered_embeddings = []
-            
-            for i, metadata in enumerate(all_results.get("metadatas", [])):
-                tags_str = metadata.get("tags", "")
-                if tags_str:
-                    import ast
-                    try:
-                        tags_list = ast.literal_eval(tags_str)
-                        if isinstance(tags_list, list):
-                            if any(tag.lower() in t.lower() or t.lower() in tag.lower() 
-                                   for t in tags_list):
-                                filtered_ids.append(all_results["ids"][i])
-                                filtered_documents.append(all_results["documents"][i])
-                                filtered_metadatas.append(metadata)
-                                embeddings_list = all_results.get("embeddings")
-                                if embeddings_list is not None and i < len(embeddings_list):
-                                    filtered_embeddings.append(embeddings_list[i])
-                        elif isinstance(tags_list, str):
-                            if tag.lower() in tags_list.lower():
-                                filtered_ids.append(all_results["ids"][i])
-                                filtered_documents.append(all_results["documents"][i])
-                                filtered_metadatas.append(metadata)
-                                embeddings_list = all_results.get("embeddings")
-                                if embeddings_list is not None and i < len(embeddings_list):
-                                    filtered_embeddings.append(embeddings_list[i])
-                    except (ValueError, SyntaxError):
-                        if tag.lower() in tags_str.lower():
-                            filtered_ids.append(all_results["ids"][i])
-                            filtered_documents.append(all_results["documents"][i])
-                            filtered_metadatas.append(metadata)
-                            embeddings_list = all_results.get("embeddings")
-                            if embeddings_list is not None and i < len(embeddings_list):
-                                filtered_embeddings.append(embeddings_list[i])
-            
-            if not filtered_ids:
-                return []
-            
-            results = {
-                "ids": filtered_ids,
-                "documents": filtered_documents,
-                "metadatas": filtered_metadatas,
-                "embeddings": filtered_embeddings,
-            }
-            
-            # If query is provided, use similarity search on filtered results
-            if query:
-                query_embedding = self.embeddings.embed_query(query)
-                filtered_embeddings = results.get("embeddings", [])
-                filtered_documents = results.get("documents", [])
-                filtered_metadatas = results.get("metadatas", [])
-                
-                # Check if we have embeddings (check length, not truthiness to avoid numpy array issues)
-                if not filtered_embeddings or len(filtered_embeddings) == 0:
-                    # If no embeddings, just return filtered documents without similarity ranking
-                    docs = []
-                    for i, doc_text in enumerate(filtered_documents):
-                        doc = Document(
-                            page_content=doc_text,
-                            metadata=filtered_metadatas[i] if filtered_metadatas and i < len(filtered_metadatas) else {},
-                        )
-                        docs.append(doc)
-                    return docs[:k]
-                
-                import numpy as np
-                query_vec = np.array(query_embedding, dtype=np.float32)
-                doc_embeddings = np.array(filtered_embeddings, dtype=np.float32)
-                
-                # Ensure doc_embeddings is 2D
-                if doc_embeddings.ndim == 1:
-                    doc_embeddings = doc_embeddings.reshape(1, -1)
-                
-                # Compute cosine similarities with proper normalization
-                query_norm = np.linalg.norm(query_vec)
-                doc_norms = np.linalg.norm(doc_embeddings, axis=1)
-                
-                # Avoid division by zero
-                doc_norms = np.where(doc_norms == 0, 1, doc_norms)
-                query_norm = query_norm if query_norm != 0 else 1
-                
-                similarities = np.dot(doc_embeddings, query_vec) / (doc_norms * query_norm)
-                top_indices = np.argsort(similarities)[::-1][:k]
-                
-                docs = []
-                for idx in top_indices:
-                    doc = Document(
-                        page_content=filtered_documents[idx],
-                        metadata=filtered_metadatas[idx] if filtered_metadatas and idx < len(filtered_metadatas) else {},
-                    )
-                    docs.append(doc)
-                
-                return docs
-            else:
-                docs = []
-                for i, doc_text in enumerate(results.get("documents", [])):
-                    doc = Document(
-                        page_content=doc_text,
-                        metadata=results.get("metadatas", [{}])[i] if results.get("metadatas") else {},
-                    )
-                    docs.append(doc)
-                
-                return docs[:k]
-                
-        except Exception as e:
-            print(f"  ❌ Error filtering by tag: {e}")
-            return []
+        return self._filter_by_list_field("tags", tag, query, k)
@@ -0,0 +1,89 @@
+"""
+Tests for CachedEmbeddings.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain_core")
+
+from langchain_core.embeddings import Embeddings
+
+from services.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    """Embeds text as [len, 1, 0] (not unit length) and records provider calls."""
+    
+    model = "fake-model"
+    
+    def __init__(self):
+        self.document_calls = []
+        self.query_calls = []
+    
+    def embed_documents(self, texts):
+        self.document_calls.append(list(texts))
+        return [[float(len(text)), 1.0, 0.0] for text in texts]
+    
+    def embed_query(self, text):
+        self.query_calls.append(text)
+        return [float(len(text)), 1.0, 0.0]
+
+
+def test_queries_are_cached():
+    provider = CountingEmbeddings()
+    cache = CachedEmbeddings(provider)
+    
+    first = cache.embed_query("kaplan meier")
+    
+    assert cache.embed_query("kaplan meier ") == first
+    assert provider.query_calls == ["kaplan meier"]
+
+
+def test_duplicates_and_hits_skip_the_provider():
+    provider = CountingEmbeddings()
+    cache = CachedEmbeddings(provider)
+    
+    cache.embed_documents(["a", "b", "a"])
+    cache.embed_documents(["b", "c"])
+    
+    assert provider.document_calls == [["a", "b"], ["c"]]
+
+
+def test_batched_queries_share_one_provider_call():
+    provider = CountingEmbeddings()
+    cache = CachedEmbeddings(provider)
+    cache.embed_query("kaplan meier")
+    
+    vectors = cache.embed_queries(["kaplan meier", "cox", "cox"])
+    
+    assert vectors[1] == vectors[2]
+    assert provider.query_calls == ["kaplan meier"]
+    assert provider.document_calls == [["cox"]]
+    # Batched results land in the query cache
+    cache.embed_query("cox")
+    assert provider.query_calls == ["kaplan meier"]
+
+
+def test_document_vectors_are_normalized():
+    cache = CachedEmbeddings(CountingEmbeddings())
+    
+    vectors = cache.embed_documents(["survival analysis", "cox"])
+    
+    for vector in vectors:
+        assert np.linalg.norm(vector) == pytest.approx(1.0, abs=1e-6)
+    # Cached hits come back normalized as well
+    for vector in cache.embed_documents(["survival analysis", "cox"]):
+        assert np.linalg.norm(vector) == pytest.approx(1.0, abs=1e-6)
+
+
+def test_document_vectors_persist_in_sqlite(tmp_path):
+    db_path = tmp_path / "embedding_cache.sqlite3"
+    first = CachedEmbeddings(CountingEmbeddings(), db_path=db_path)
+    expected = first.embed_documents(["survival analysis"])
+    
+    provider = CountingEmbeddings()
+    second = CachedEmbeddings(provider, db_path=db_path)
+    
+    assert second.embed_documents(["survival analysis"]) == expected
+    assert provider.document_calls == []
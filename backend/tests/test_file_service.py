@@ -0,0 +1,105 @@
+"""
+Tests for file_service helpers.
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+from services.file_service import FileService, relpath_fast
+
+
+def test_relpath_fast_strips_root():
+    root = os.path.join(os.sep, "data", "talks")
+    path = os.path.join(root, "2023", "lecture.pdf")
+    
+    assert relpath_fast(root, path) == os.path.join("2023", "lecture.pdf")
+    assert relpath_fast(root + os.sep, path) == os.path.join("2023", "lecture.pdf")
+
+
+def test_relpath_fast_curdir():
+    assert relpath_fast(os.curdir, os.path.join(os.curdir, "lecture.pdf")) == "lecture.pdf"
+    assert relpath_fast(os.curdir, "lecture.pdf") == "lecture.pdf"
+
+
+def test_relpath_fast_matches_pathlib(tmp_path):
+    from pathlib import Path
+    
+    path = tmp_path / "a" / "b.txt"
+    assert relpath_fast(str(tmp_path), str(path)) == str(Path(path).relative_to(tmp_path))
+
+
+def test_relpath_fast_rejects_paths_outside_root():
+    root = os.path.join(os.sep, "data", "talks")
+    
+    with pytest.raises(ValueError):
+        relpath_fast(root, os.path.join(os.sep, "data", "talks-old", "lecture.pdf"))
+
+
+def _write_ruga(file_path):
+    from ruga_file_handler import FinalFileRecord, save_ruga_metadata
+    
+    now = datetime.now(timezone.utc)
+    save_ruga_metadata(file_path, FinalFileRecord.model_validate({
+        "file_id": uuid4(),
+        "original_path": str(file_path),
+        "file_type": file_path.suffix.lstrip("."),
+        "content_hash": "0" * 64,
+        "title": file_path.stem,
+        "suggested_filename": file_path.name,
+        "categories": ["Seminar"],
+        "creation_date": None,
+        "last_modified_date": now,
+        "analysis_date": now,
+        "authors": [],
+        "topics": [],
+        "tags": [],
+        "summary": "",
+        "glossary_terms": [],
+        "possible_duplicate": False,
+        "llm_model": "test",
+        "extracted_at": now,
+    }))
+
+
+def test_listing_and_stream_agree(tmp_path):
+    (tmp_path / "b.txt").write_text("b")
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "talk.pdf").write_bytes(b"%PDF")
+    _write_ruga(tmp_path / "a" / "talk.pdf")
+    (tmp_path / "link").symlink_to(tmp_path / "a")
+    
+    async def run():
+        service = FileService()
+        files = await service.list_files_recursive(tmp_path)
+        lines = [line async for line in service.iter_files_ndjson(tmp_path)]
+        return [file_info.model_dump() for file_info in files], [json.loads(line) for line in lines]
+    
+    listed, streamed = asyncio.run(run())
+    
+    assert listed == streamed
+    assert [item["path"] for item in listed] == ["a", os.path.join("a", "talk.pdf"), "b.txt", "link"]
+    assert listed[1]["has_ruga"] and listed[1]["ruga_content"]["categories"] == ["Seminar"]
+
+
+def test_invalidation_during_scan_is_not_overwritten(tmp_path):
+    (tmp_path / "a.txt").write_text("a")
+    service = FileService()
+    scan = service._scan_listing
+    
+    def scan_then_invalidate(root_path):
+        result = scan(root_path)
+        # A .ruga file is written while the listing is being built
+        service.invalidate_cache(root_path / "a.txt")
+        return result
+    
+    service._scan_listing = scan_then_invalidate
+    asyncio.run(service.list_files_recursive(tmp_path))
+    
+    assert str(tmp_path.absolute()) not in service._list_cache
@@ -0,0 +1,108 @@
+"""
+Tests for JobService.
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+from models.schemas import AnalysisStatus, JobType
+from services.job_service import JobService
+
+
+def _create_job(service, file_paths):
+    return service.create_job(JobType.FOLDER, "/root", "/root", file_paths)
+
+
+def test_batched_updates_apply_every_file():
+    async def run():
+        service = JobService()
+        job_id = _create_job(service, ["a.pdf", "b.pdf", "c.pdf"])
+        
+        await service.update_job_file_statuses(job_id, [
+            ("a.pdf", AnalysisStatus.ANALYZED, None),
+            ("b.pdf", AnalysisStatus.ANALYZED, None),
+        ])
+        
+        statuses = await service.get_job_files_status(job_id)
+        assert statuses == {
+            "a.pdf": AnalysisStatus.ANALYZED,
+            "b.pdf": AnalysisStatus.ANALYZED,
+            "c.pdf": AnalysisStatus.PENDING,
+        }
+        job = await service.get_job(job_id)
+        assert job.files_processed == 2
+        assert job.status == AnalysisStatus.PENDING
+    
+    asyncio.run(run())
+
+
+def test_unknown_job_is_ignored():
+    async def run():
+        service = JobService()
+        await service.update_job_file_statuses("missing", [("a.pdf", AnalysisStatus.ANALYZED, None)])
+        assert await service.get_job("missing") is None
+    
+    asyncio.run(run())
+
+
+def test_job_finishes_when_all_files_are_analyzed():
+    async def run():
+        service = JobService()
+        job_id = _create_job(service, ["a.pdf", "b.pdf"])
+        
+        await service.update_job_file_status(job_id, "a.pdf", AnalysisStatus.IN_PROCESS)
+        assert (await service.get_job(job_id)).status == AnalysisStatus.IN_PROCESS
+        
+        await service.update_job_file_statuses(job_id, [
+            ("a.pdf", AnalysisStatus.ANALYZED, None),
+            ("b.pdf", AnalysisStatus.ANALYZED, None),
+        ])
+        job = await asyncio.wait_for(service.wait_for_job(job_id), timeout=1)
+        assert job.status == AnalysisStatus.ANALYZED
+        assert job.files_processed == 2
+        assert job.files_failed == 0
+    
+    asyncio.run(run())
+
+
+def test_repeated_updates_are_not_double_counted():
+    async def run():
+        service = JobService()
+        job_id = _create_job(service, ["a.pdf", "b.pdf"])
+        
+        await service.update_job_file_status(job_id, "a.pdf", AnalysisStatus.ANALYZED)
+        await service.update_job_file_status(job_id, "a.pdf", AnalysisStatus.ANALYZED)
+        await service.update_job_file_status(job_id, "b.pdf", AnalysisStatus.ERROR, "boom")
+        await service.update_job_file_status(job_id, "b.pdf", AnalysisStatus.ERROR, "boom")
+        
+        job = await service.get_job(job_id)
+        assert job.files_processed == 1
+        assert job.files_failed == 1
+        assert job.error_message == "boom"
+        assert service.job_status_counts[job_id][AnalysisStatus.ANALYZED] == 1
+        assert service.job_status_counts[job_id][AnalysisStatus.ERROR] == 1
+        assert service.job_status_counts[job_id][AnalysisStatus.PENDING] == 0
+    
+    asyncio.run(run())
+
+
+def test_error_status_only_once_all_files_are_final():
+    async def run():
+        service = JobService()
+        job_id = _create_job(service, ["a.pdf", "b.pdf", "c.pdf"])
+        
+        await service.update_job_file_status(job_id, "a.pdf", AnalysisStatus.ERROR)
+        assert (await service.get_job(job_id)).status == AnalysisStatus.IN_PROCESS
+        
+        await service.update_job_file_statuses(job_id, [
+            ("b.pdf", AnalysisStatus.ANALYZED, None),
+            ("c.pdf", AnalysisStatus.ANALYZED, None),
+        ])
+        job = await service.get_job(job_id)
+        assert job.status == AnalysisStatus.ERROR
+        assert service.job_events[job_id].is_set()
+    
+    asyncio.run(run())
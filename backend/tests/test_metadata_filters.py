@@ -0,0 +1,52 @@
+"""
+Tests for the chunk metadata and filter helpers.
+"""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from services.metadata_filters import (
+    cosine_topk,
+    indexed_fields,
+    join_list_field,
+    list_field_matches,
+)
+
+
+def test_cosine_topk_ranks_best_first():
+    query = [1.0, 0.0]
+    docs = [[0.0, 1.0], [1.0, 0.0], [0.7, 0.7]]
+    
+    assert list(cosine_topk(query, docs, 3)) == [1, 2, 0]
+    assert list(cosine_topk(query, docs, 1)) == [1]
+
+
+def test_cosine_topk_normalizes_rows():
+    query = [1.0, 0.0]
+    # The long vector points away from the query and must not win on magnitude
+    docs = [[10.0, 10.0], [0.9, 0.1], [0.0, 1.0]]
+    
+    assert list(cosine_topk(query, docs, 2)) == [1, 0]
+
+
+def test_list_fields_are_stored_delimited():
+    assert join_list_field(["Research Meeting", "Teaching"]) == "|Research Meeting|Teaching|"
+    assert join_list_field("Seminar") == "|Seminar|"
+    assert join_list_field(None) == "||"
+    
+    fields = indexed_fields({"categories": ["Education/Capita Selecta"], "tags": []})
+    assert fields["categories_lc"] == "|education/capita selecta|"
+    assert fields["tags"] == "||"
+
+
+def test_list_field_matches_partial_values():
+    stored = "|education/capita selecta|research meeting|"
+    
+    assert list_field_matches(stored, "capita")
+    assert list_field_matches(stored, "education/capita selecta")
+    assert list_field_matches(stored, "research meeting notes")
+    assert not list_field_matches(stored, "workshop")
+    assert not list_field_matches("||", "workshop")
+    # Rows indexed before the delimited format
+    assert list_field_matches("['seminar', 'workshop']", "workshop")
@@ -0,0 +1,73 @@
+"""
+Tests for SearchBatcher.
+"""
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from services.search_batcher import SearchBatcher
+
+
+class SlowSearch:
+    """Search returning one result per query, slow enough for others to queue up."""
+    
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.batches = []
+    
+    def __call__(self, queries):
+        self.batches.append(list(queries))
+        time.sleep(self.delay)
+        return [[f"doc for {query}"] for query in queries]
+
+
+def test_lone_search_runs_immediately():
+    search = SlowSearch(delay=0)
+    batcher = SearchBatcher(search)
+    
+    assert batcher.search("survival") == ["doc for survival"]
+    assert search.batches == [["survival"]]
+
+
+def test_concurrent_searches_get_their_own_results():
+    search = SlowSearch()
+    batcher = SearchBatcher(search)
+    queries = [f"query {i}" for i in range(8)]
+    results = {}
+    
+    first = threading.Thread(target=lambda: results.update(first=batcher.search("first")))
+    first.start()
+    # Let the first search start running so the others queue behind it
+    time.sleep(0.01)
+    threads = [
+        threading.Thread(target=lambda q=q: results.update({q: batcher.search(q)}))
+        for q in queries
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in [first, *threads]:
+        thread.join()
+    
+    assert results["first"] == ["doc for first"]
+    for query in queries:
+        assert results[query] == [f"doc for {query}"]
+    # The queued searches ran batched, not one call each
+    assert len(search.batches) < len(queries) + 1
+    assert sorted(q for batch in search.batches for q in batch) == sorted(["first", *queries])
+
+
+def test_errors_reach_every_caller():
+    def failing(queries):
+        raise RuntimeError("chroma unavailable")
+    
+    batcher = SearchBatcher(failing)
+    
+    with pytest.raises(RuntimeError):
+        batcher.search("survival")
+    # The batcher is idle again after a failure
+    with pytest.raises(RuntimeError):
+        batcher.search("survival")
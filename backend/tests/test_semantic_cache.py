@@ -0,0 +1,89 @@
+"""
+Tests for SemanticQueryCache.
+"""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from services.semantic_cache import SemanticQueryCache
+
+
+# Fixed embeddings: "kaplan meier" and "kaplan-meier curves" are near-identical,
+# "cox regression" points elsewhere
+VECTORS = {
+    "kaplan meier": [1.0, 0.0, 0.0],
+    "kaplan-meier curves": [0.99, 0.05, 0.0],
+    "cox regression": [0.0, 1.0, 0.0],
+}
+
+
+class FakeEmbedder:
+    """Returns fixed vectors and counts calls."""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def __call__(self, query):
+        self.calls.append(query)
+        return VECTORS[query]
+
+
+def test_exact_hit_skips_embedding():
+    embed = FakeEmbedder()
+    cache = SemanticQueryCache(embed)
+    cache.put("kaplan meier", "retrieve", "result")
+    embed.calls.clear()
+    
+    assert cache.get("  kaplan meier ", "retrieve") == "result"
+    assert embed.calls == []
+
+
+def test_similar_query_hits():
+    cache = SemanticQueryCache(FakeEmbedder())
+    cache.put("kaplan meier", "retrieve", "result")
+    
+    assert cache.get("kaplan-meier curves", "retrieve") == "result"
+
+
+def test_dissimilar_query_misses():
+    cache = SemanticQueryCache(FakeEmbedder())
+    cache.put("kaplan meier", "retrieve", "result")
+    
+    assert cache.get("cox regression", "retrieve") is None
+
+
+def test_filter_key_separates_results():
+    cache = SemanticQueryCache(FakeEmbedder())
+    cache.put("kaplan meier", "category:Seminar", "seminar result")
+    
+    assert cache.get("kaplan meier", "category:Workshop") is None
+    assert cache.get("kaplan-meier curves", "category:Workshop") is None
+
+
+def test_expired_entries_miss():
+    cache = SemanticQueryCache(FakeEmbedder(), ttl=-1.0)
+    cache.put("kaplan meier", "retrieve", "result")
+    
+    assert cache.get("kaplan meier", "retrieve") is None
+    assert cache.get("kaplan-meier curves", "retrieve") is None
+
+
+def test_clear_invalidates():
+    cache = SemanticQueryCache(FakeEmbedder())
+    cache.put("kaplan meier", "retrieve", "result")
+    cache.clear()
+    
+    assert cache.get("kaplan meier", "retrieve") is None
+
+
+def test_lru_eviction():
+    cache = SemanticQueryCache(FakeEmbedder(), max_entries=2)
+    cache.put("kaplan meier", "a", 1)
+    cache.put("kaplan meier", "b", 2)
+    cache.get("kaplan meier", "a")
+    cache.put("kaplan meier", "c", 3)
+    
+    assert cache.get("kaplan meier", "a") == 1
+    assert cache.get("kaplan meier", "b") is None
+    assert cache.get("kaplan meier", "c") == 3
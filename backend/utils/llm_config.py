@@ -3,14 +3,62 @@ Utility for configuring LLM clients and embeddings with support for OpenAI and G
 """
 
 import os
+from functools import lru_cache
+
+import httpx
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from typing import Optional
 
+# Connection pool limits shared by all provider clients
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+# Shared HTTP clients (created on first use, closed on app shutdown)
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Get the shared sync HTTP client used for LLM and embedding requests.
+    
+    Reusing one pooled client keeps TLS connections alive across services
+    instead of each provider client opening its own.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.Client(limits=HTTP_LIMITS)
+    return _http_client
+
 
+def get_http_async_client() -> httpx.AsyncClient:
+    """Get the shared async HTTP client used for LLM and embedding requests."""
+    global _http_async_client
+    if _http_async_client is None or _http_async_client.is_closed:
+        _http_async_client = httpx.AsyncClient(limits=HTTP_LIMITS)
+    return _http_async_client
+
+
+async def close_http_clients():
+    """Close the shared HTTP clients (call on application shutdown)."""
+    global _http_client, _http_async_client
+    # Cached provider clients hold the HTTP clients closed below
+    get_embeddings.cache_clear()
+    get_chat_llm.cache_clear()
+    if _http_client is not None:
+        _http_client.close()
+        _http_client = None
+    if _http_async_client is not None:
+        await _http_async_client.aclose()
+        _http_async_client = None
+
+
+@lru_cache(maxsize=None)
 def get_embeddings() -> OpenAIEmbeddings:
     """
     Get an OpenAIEmbeddings instance configured for either OpenAI or GreenPT.
     
+    The instance is created once and shared by all callers.
+    
     Returns:
         Configured OpenAIEmbeddings instance
     """
@@ -24,16 +72,26 @@ def get_embeddings() -> OpenAIEmbeddings:
             model="green-embedding",
             openai_api_base="https://api.greenpt.ai/v1",
             openai_api_key=greenpt_api_key,
+            http_client=get_http_client(),
+            http_async_client=get_http_async_client(),
         )
     else:
         # Use OpenAI embeddings (default)
-        return OpenAIEmbeddings(model="text-embedding-3-small")
+        return OpenAIEmbeddings(
+            model="text-embedding-3-small",
+            http_client=get_http_client(),
+            http_async_client=get_http_async_client(),
+        )
 
 
+@lru_cache(maxsize=None)
 def get_chat_llm(model: Optional[str] = None, temperature: float = 0) -> ChatOpenAI:
     """
     Get a ChatOpenAI instance configured for either OpenAI or GreenPT.
     
+    One instance is created per (model, temperature) and shared by all
+    callers, so services reuse the same client setup.
+    
     Args:
         model: Model name (optional, will use default based on provider)
         temperature: Temperature for the model
@@ -53,6 +111,8 @@ def get_chat_llm(model: Optional[str] = None, temperature: float = 0) -> ChatOpe
             temperature=temperature,
             base_url="https://api.greenpt.ai/v1",
             api_key=greenpt_api_key,
+            http_client=get_http_client(),
+            http_async_client=get_http_async_client(),
         )
     else:
         # Use OpenAI (default)
@@ -60,4 +120,6 @@ def get_chat_llm(model: Optional[str] = None, temperature: float = 0) -> ChatOpe
         return ChatOpenAI(
             model=openai_model,
             temperature=temperature,
+            http_client=get_http_client(),
+            http_async_client=get_http_async_client(),
         )
@@ -0,0 +1,71 @@
+"""
+Extract text content from files (plain text directly, other formats with Docling).
+
+Kept free of import-time side effects (no environment loading, LLM clients
+or directory creation), so extraction worker processes can import it cheaply.
+"""
+
+import threading
+from pathlib import Path
+from functools import lru_cache
+
+from docling.document_converter import DocumentConverter
+
+
+def process_txt_file(txt_path: Path) -> str:
+    """Process a .txt file directly (since it's already text)."""
+    return txt_path.read_text(encoding="utf-8")
+
+
+# DocumentConverter is not safe to share between threads: conversions in one
+# process (e.g. process_folder's file workers) take turns on a single instance
+# instead of each thread loading its own copy of the models
+_convert_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def get_converter() -> DocumentConverter:
+    """Get the shared Docling converter (models are loaded once per process)."""
+    return DocumentConverter()
+
+
+def process_with_docling(file_path: Path) -> str:
+    """Process a file with Docling (PDF, DOCX, etc.)."""
+    with _convert_lock:
+        result = get_converter().convert(str(file_path))
+    return result.document.export_to_markdown()
+
+
+def get_file_content(file_path: Path) -> str:
+    """
+    Extract content from a file using Docling if supported, otherwise read directly.
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        Extracted text content
+    """
+    file_ext = file_path.suffix.lower()
+    
+    if file_ext == '.txt':
+        # Read .txt files directly
+        return process_txt_file(file_path)
+    elif file_ext == '.pdf':
+        # Use Docling for PDF
+        try:
+            return process_with_docling(file_path)
+        except Exception as e:
+            print(f"⚠️  Error processing {file_path.name} with Docling: {e}")
+            # Fallback: try to read as text (won't work for PDF, but handles error gracefully)
+            return file_path.read_text(encoding="utf-8", errors="ignore")
+    else:
+        # For other formats, try Docling first, then fallback to text reading
+        try:
+            return process_with_docling(file_path)
+        except Exception:
+            # Fallback to reading as text
+            try:
+                return file_path.read_text(encoding="utf-8", errors="ignore")
+            except Exception:
+                return f"[Could not extract content from {file_path.name}]"
@@ -11,28 +11,20 @@ Usage:
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import sys
 
 # Import dependencies
 from test_llm import (
-    chain,
+    get_chain,
     build_final_record,
     FinalFileRecord,
     LLMExtractionSchema,
 )
-from docling.document_converter import DocumentConverter
-
-# Define helper functions for file processing
-def process_txt_file(txt_path: Path) -> str:
-    """Process a .txt file directly (since it's already text)."""
-    return txt_path.read_text(encoding="utf-8")
-
-
-def process_with_docling(file_path: Path) -> str:
-    """Process a file with Docling (PDF, DOCX, etc.)."""
-    converter = DocumentConverter()
-    result = converter.convert(str(file_path))
-    return result.document.export_to_markdown()
+# Content extraction lives in its own module (no LLM setup on import), so
+# extraction worker processes can load it cheaply
+from content_extraction import get_file_content
 from ruga_file_handler import (
     has_ruga_metadata,
     save_ruga_metadata,
@@ -41,79 +33,60 @@ from ruga_file_handler import (
 )
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+from dotenv import load_dotenv
 
 # Docling converter will be initialized when needed
 
-# Initialize LLM for folder structure suggestion (non-structured)
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0,
-)
-
+# Number of files analyzed concurrently (bounded to respect provider rate limits)
+MAX_CONCURRENT_FILES = 8
 
-def get_file_content(file_path: Path) -> str:
-    """
-    Extract content from a file using Docling if supported, otherwise read directly.
-    
-    Args:
-        file_path: Path to the file
-        
-    Returns:
-        Extracted text content
-    """
-    file_ext = file_path.suffix.lower()
-    
-    if file_ext == '.txt':
-        # Read .txt files directly
-        return process_txt_file(file_path)
-    elif file_ext == '.pdf':
-        # Use Docling for PDF
-        try:
-            return process_with_docling(file_path)
-        except Exception as e:
-            print(f"⚠️  Error processing PDF with Docling: {e}")
-            # Fallback: try to read as text (won't work for PDF, but handles error gracefully)
-            return file_path.read_text(encoding="utf-8", errors="ignore")
-    else:
-        # For other formats, try Docling first, then fallback to text reading
-        try:
-            return process_with_docling(file_path)
-        except Exception:
-            # Fallback to reading as text
-            try:
-                return file_path.read_text(encoding="utf-8", errors="ignore")
-            except Exception:
-                return f"[Could not extract content from {file_path.name}]"
+@lru_cache(maxsize=1)
+def get_llm() -> ChatOpenAI:
+    """Get the LLM for folder structure suggestion (non-structured), created on first use."""
+    # Needed even when no file is analyzed (get_chain, which also loads .env, never runs)
+    load_dotenv(override=True)
+    return ChatOpenAI(
+        model="gpt-4o-mini",
+        temperature=0,
+    )
 
 
-def process_file_for_metadata(file_path: Path, folder_root: Path) -> Optional[FinalFileRecord]:
+def process_file_for_metadata(
+    file_path: Path,
+    folder_root: Path,
+    content: Optional[str] = None,
+) -> Optional[FinalFileRecord]:
     """
     Process a single file to generate .ruga metadata.
     
     Args:
         file_path: Path to the file to process
         folder_root: Root folder path (for relative paths)
+        content: Already extracted content (extracted here if not given)
         
     Returns:
         FinalFileRecord if successful, None otherwise
     """
-    print(f"\n📄 Processing: {file_path.relative_to(folder_root)}")
+    # Files are processed concurrently: prefix every line with the file it is about
+    name = file_path.relative_to(folder_root)
+    print(f"\n📄 Processing: {name}")
     
     try:
         # Extract content
-        print("  📖 Extracting content...")
-        content = get_file_content(file_path)
+        if content is None:
+            print(f"  [{name}] 📖 Extracting content...")
+            content = get_file_content(file_path)
         
         if not content or len(content.strip()) < 10:
-            print(f"  ⚠️  File appears empty or content extraction failed")
+            print(f"  [{name}] ⚠️  File appears empty or content extraction failed")
             return None
         
         # Run LLM extraction
-        print("  🤖 Running LLM extraction...")
-        llm_result = chain.invoke({"text": content})
+        print(f"  [{name}] 🤖 Running LLM extraction...")
+        llm_result = get_chain().invoke({"text": content})
         
         # Build final record
-        print("  📊 Building final record...")
+        print(f"  [{name}] 📊 Building final record...")
         final_record = build_final_record(
             llm_result=llm_result,
             file_path=file_path,
@@ -121,14 +94,14 @@ def process_file_for_metadata(file_path: Path, folder_root: Path) -> Optional[Fi
         )
         
         # Save to .ruga file
-        print("  💾 Saving .ruga metadata...")
+        print(f"  [{name}] 💾 Saving .ruga metadata...")
         ruga_path = save_ruga_metadata(file_path, final_record)
-        print(f"  ✅ Saved: {ruga_path.name}")
+        print(f"  [{name}] ✅ Saved: {ruga_path.name}")
         
         return final_record
         
     except Exception as e:
-        print(f"  ❌ Error processing file: {e}")
+        print(f"  [{name}] ❌ Error processing file: {e}")
         return None
 
 
@@ -282,7 +255,7 @@ Suggested new folder structure:
         ("human", prompt_text),
     ])
     
-    chain_prompt = prompt | llm
+    chain_prompt = prompt | get_llm()
     
     print("\n🤖 Asking LLM to suggest new folder structure...")
     response = chain_prompt.invoke({})
@@ -333,8 +306,15 @@ def process_folder(folder_path: Path, skip_existing: bool = True) -> Dict[str, A
         processed_count = 0
         failed_count = 0
         
-        for file_path in files_to_process:
-            result = process_file_for_metadata(file_path, folder_path)
+        # LLM calls dominate per-file time, so run several files concurrently
+        # (Docling conversions share one converter and take turns)
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FILES) as executor:
+            results = list(executor.map(
+                lambda file_path: process_file_for_metadata(file_path, folder_path),
+                files_to_process,
+            ))
+        
+        for result in results:
             if result:
                 processed_count += 1
             else:
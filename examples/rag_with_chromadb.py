@@ -10,12 +10,16 @@ This script demonstrates:
 
 from pathlib import Path
 from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
 import os
 
 from docling.document_converter import DocumentConverter
 from langchain.tools import tool
 from langchain.agents import create_agent
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from chromadb.config import Settings
 from langchain_chroma import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
@@ -34,6 +38,9 @@ CHROMA_DB_PATH = PROJECT_ROOT / "chroma_db"
 EXAMPLES_DIR = Path(__file__).parent
 UNSTRUCTURED_FOLDER = EXAMPLES_DIR / "unstructured_folder"
 
+# Processes for Docling extraction (each loads its own copy of the models)
+EXTRACTION_PROCESSES = min(4, os.cpu_count() or 1)
+
 # Ensure ChromaDB directory exists
 CHROMA_DB_PATH.mkdir(exist_ok=True)
 
@@ -46,10 +53,15 @@ def process_txt_file(file_path: Path) -> str:
     return file_path.read_text(encoding="utf-8")
 
 
+@lru_cache(maxsize=1)
+def get_converter() -> DocumentConverter:
+    """Get the Docling converter, created on first use (once per process)."""
+    return DocumentConverter()
+
+
 def process_with_docling(file_path: Path) -> str:
     """Process a file with Docling (PDF, DOCX, etc.) and return markdown."""
-    converter = DocumentConverter()
-    result = converter.convert(str(file_path))
+    result = get_converter().convert(str(file_path))
     return result.document.export_to_markdown()
 
 
@@ -111,11 +123,26 @@ def load_documents_from_folder(folder_path: Path) -> List[Document]:
     supported_extensions = {'.txt', '.pdf', '.docx', '.doc', '.md'}
     
     # Find all supported files
-    for file_path in folder_path.rglob('*'):
-        if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
+    file_paths = [
+        file_path for file_path in folder_path.rglob('*')
+        if file_path.is_file() and file_path.suffix.lower() in supported_extensions
+    ]
+    
+    # Plain text is read directly; only files that need Docling (CPU-bound
+    # parsing) go to worker processes, and the pool is skipped without them
+    docling_paths = [file_path for file_path in file_paths if file_path.suffix.lower() != '.txt']
+    pool = (
+        ProcessPoolExecutor(max_workers=min(EXTRACTION_PROCESSES, len(docling_paths)))
+        if docling_paths else nullcontext()
+    )
+    with pool as executor:
+        futures = {file_path: executor.submit(get_file_content, file_path) for file_path in docling_paths}
+        
+        for file_path in file_paths:
             try:
                 print(f"📄 Processing: {file_path.relative_to(folder_path)}")
-                content = get_file_content(file_path)
+                future = futures.get(file_path)
+                content = future.result() if future else get_file_content(file_path)
                 
                 # Create LangChain Document with metadata
                 doc = Document(
@@ -154,6 +181,7 @@ def create_vector_store(embeddings, collection_name: str = "documents") -> Chrom
         collection_name=collection_name,
         embedding_function=embeddings,
         persist_directory=str(CHROMA_DB_PATH),
+        client_settings=Settings(is_persistent=True, anonymized_telemetry=False),
     )
     return vector_store
 
@@ -91,8 +91,8 @@ def has_ruga_metadata(file_path: Path) -> bool:
     Returns:
         True if .ruga file exists, False otherwise
     """
-    ruga_path = get_ruga_path(file_path)
-    return ruga_path.exists() and ruga_path.is_file()
+    # is_file() is False for missing paths, so one stat call is enough
+    return get_ruga_path(file_path).is_file()
 
 
 def save_ruga_metadata(file_path: Path, metadata: FinalFileRecord) -> Path:
@@ -146,12 +146,9 @@ def load_ruga_metadata(file_path: Path) -> Optional[FinalFileRecord]:
         return None
     
     try:
-        # Read and parse JSON
-        content = ruga_path.read_text(encoding="utf-8")
-        metadata_dict = json.loads(content)
-        
-        # Convert to FinalFileRecord
-        return FinalFileRecord(**metadata_dict)
+        # Parse and validate in one pass with pydantic's native JSON parser
+        content = ruga_path.read_bytes()
+        return FinalFileRecord.model_validate_json(content)
     except (json.JSONDecodeError, ValidationError, Exception) as e:
         print(f"⚠️  Error loading .ruga file {ruga_path}: {e}")
         return None
@@ -10,6 +10,7 @@ End-to-end document metadata extraction pipeline.
 from datetime import date, datetime, timezone
 from typing import List, Optional
 from pathlib import Path
+from functools import lru_cache
 from uuid import UUID, uuid4
 import hashlib
 import re
@@ -18,11 +19,10 @@ from pydantic import BaseModel, Field
 
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
 
 from dotenv import load_dotenv
 
-load_dotenv(override=True)
-
 
 # ============================================================
 # 1. Utilities
@@ -45,7 +45,6 @@ def load_vocab(path: str) -> List[str]:
 # Get project root (parent of examples/)
 PROJECT_ROOT = Path(__file__).parent.parent
 ASSETS_DIR = PROJECT_ROOT / "assets"
-ASSETS_DIR.mkdir(exist_ok=True)
 
 TOPICS_FILE = ASSETS_DIR / "topics.txt"
 TAGS_FILE = ASSETS_DIR / "tags.txt"
@@ -205,12 +204,13 @@ def build_final_record(
     llm_model_name: str,
 ) -> FinalFileRecord:
     stat = file_path.stat()
-    # Read file content once for hash computation
-    file_bytes = file_path.read_bytes()
-    content_hash = hashlib.sha256(file_bytes).hexdigest()
+    # Stream the file through SHA-256 instead of loading it into memory
+    with open(file_path, "rb") as f:
+        content_hash = hashlib.file_digest(f, "sha256").hexdigest()
     
     title = llm_result.suggested_title or file_path.stem
     file_type = file_path.suffix.lstrip(".") or "txt"
+    now = datetime.now(timezone.utc)
 
     return FinalFileRecord(
         file_id=uuid4(),
@@ -230,7 +230,7 @@ def build_final_record(
 
         creation_date=llm_result.creation_date,
         last_modified_date=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
-        analysis_date=datetime.now(timezone.utc),
+        analysis_date=now,
 
         authors=llm_result.authors,
 
@@ -250,24 +250,12 @@ def build_final_record(
         reviewed_by_human=False,
 
         llm_model=llm_model_name,
-        extracted_at=datetime.now(timezone.utc),
+        extracted_at=now,
     )
 
 
 # ============================================================
-# 6. LLM Setup
-# ============================================================
-
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0,
-)
-
-structured_llm = llm.with_structured_output(LLMExtractionSchema)
-
-
-# ============================================================
-# 7. Prompt
+# 6. Prompt
 # ============================================================
 
 system_prompt = f"""
@@ -311,7 +299,26 @@ prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-chain = prompt | structured_llm
+
+# ============================================================
+# 7. LLM Setup
+# ============================================================
+
+@lru_cache(maxsize=1)
+def get_chain() -> Runnable:
+    """
+    Get the metadata extraction chain (prompt | structured LLM), created on first use.
+    
+    Environment loading and the LLM client are deferred to the first call, so
+    importing this module (e.g. for the schemas) has no side effects.
+    """
+    load_dotenv(override=True)
+    llm = ChatOpenAI(
+        model="gpt-4o-mini",
+        temperature=0,
+    )
+    structured_llm = llm.with_structured_output(LLMExtractionSchema)
+    return prompt | structured_llm
 
 
 # ============================================================
@@ -331,12 +338,13 @@ if __name__ == "__main__":
     """
 
     # Create example file
+    ASSETS_DIR.mkdir(exist_ok=True)
     example_file = ASSETS_DIR / "example_presentation.txt"
     example_file.write_text(example_text, encoding="utf-8")
     print(f"Created example file at: {example_file.absolute()}")
 
     # Run LLM extraction
-    llm_result = chain.invoke({"text": example_text})
+    llm_result = get_chain().invoke({"text": example_text})
 
     # Build final system record
     final_record = build_final_record(
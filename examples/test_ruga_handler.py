@@ -19,7 +19,7 @@ from ruga_file_handler import (
 
 # Import from test_llm
 from test_llm import (
-    chain,
+    get_chain,
     build_final_record,
     UNSTRUCTURED_FOLDER
 )
@@ -63,7 +63,7 @@ if __name__ == "__main__":
         
         # Extract metadata using LLM
         print("🤖 Running LLM extraction...")
-        llm_result = chain.invoke({"text": file_content})
+        llm_result = get_chain().invoke({"text": file_content})
         
         # Build final record
         print("📊 Building final record...")